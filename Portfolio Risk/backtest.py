@@ -0,0 +1,147 @@
+"""Historical backtests of fixed target weights with drift, rebalancing and transaction costs.
+
+`portfolio_returns` applies the same weights every day, which means rebalancing back to them every
+day for free. `backtest` instead lets the weights drift with the prices between rebalancing
+dates and charges a cost per unit of turnover when it trades back to the targets. The rebalancing
+can be never (buy and hold), on a calendar (daily, monthly, quarterly, annually) or whenever a
+weight has drifted more than a threshold away from its target.
+
+Many strategies (target weight vectors) run at once. For buy and hold and calendar rebalancing,
+the growth of every asset since the last rebalancing is a cumulative sum of log returns that
+restarts at each rebalancing date, so the portfolio values of all strategies are one matrix
+product with the target weights. Threshold rebalancing depends on the path, so it steps through
+the days, but each step handles all strategies and assets as arrays.
+
+The result has the same shape as `portfolio_returns` (a Series, or a DataFrame with one column
+per strategy), so it goes straight into `drawdowns`, `sharpe_ratio` and the other risk metrics.
+
+Functions:
+- `rebalancing_dates`: Marks the days on whose close a calendar schedule trades.
+- `backtest`: Daily returns of buy-and-hold or rebalanced portfolios, net of costs.
+"""
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+SCHEDULES = {'daily': 'D', 'monthly': 'M', 'quarterly': 'Q', 'annually': 'Y'} # calendar -> pandas period
+THRESHOLD = 0.05 # default absolute drift of a weight that triggers threshold rebalancing
+
+
+def rebalancing_dates(index: pd.DatetimeIndex, rebalance: str) -> np.ndarray:
+    """Marks the days on whose close a calendar schedule rebalances.
+
+    That is the last trading day of each period; the last day of the data never rebalances.
+
+    Args:
+        index (pd.DatetimeIndex): Dates of the daily returns.
+        rebalance (str): 'never', 'daily', 'monthly', 'quarterly' or 'annually'.
+
+    Raises:
+        ValueError: For an unknown schedule or returns without a date index.
+
+    Returns:
+        np.ndarray: One boolean per day.
+    """
+    if rebalance == 'never':
+        return np.zeros(len(index), dtype=bool)
+    if rebalance not in SCHEDULES:
+        raise ValueError(f"Invalid rebalance. Choose 'never', 'threshold' or one of {', '.join(SCHEDULES)}.")
+    if rebalance == 'daily':
+        dates = np.ones(len(index), dtype=bool)
+    else:
+        if not isinstance(index, pd.DatetimeIndex):
+            raise ValueError("Calendar rebalancing needs returns indexed by date.")
+        periods = index.to_period(SCHEDULES[rebalance])
+        dates = np.append(periods[1:] != periods[:-1], False)
+    dates[-1] = False
+    return dates
+
+
+def _calendar_backtest(returns: np.ndarray, weights: np.ndarray, dates: np.ndarray) -> tuple:
+    """Portfolio returns (days x strategies) and turnover for rebalancing on fixed dates."""
+    log_growth = np.cumsum(np.log1p(returns), axis=0)
+    # log growth up to the last rebalancing before each day (0 before the first one)
+    segment = np.concatenate([[0], np.cumsum(dates)[:-1]])
+    starts = np.concatenate([np.zeros((1, returns.shape[1])), log_growth[dates]])
+    growth = np.exp(log_growth - starts[segment]) # per asset, since the last rebalancing
+    values = growth @ weights # value of every strategy since the last rebalancing
+
+    previous = np.ones_like(values)
+    previous[1:] = values[:-1]
+    previous[1:][dates[:-1]] = 1.0 # the day after a rebalancing starts from the target weights
+    portfolio = values / previous - 1
+
+    # at each rebalancing the drifted weights go back to the targets
+    turnover = np.zeros_like(values)
+    for day in np.flatnonzero(dates):
+        drifted = weights * growth[day][:, None] / values[day]
+        turnover[day] = np.abs(weights - drifted).sum(axis=0)
+    return portfolio, turnover
+
+
+def _threshold_backtest(returns: np.ndarray, weights: np.ndarray, threshold: float) -> tuple:
+    """Portfolio returns and turnover when any weight drifting beyond `threshold` triggers a trade."""
+    holdings = weights.copy() # current weights, per asset and strategy
+    portfolio = np.empty((len(returns), weights.shape[1]))
+    turnover = np.zeros_like(portfolio)
+    for day, daily_returns in enumerate(returns):
+        holdings = holdings * (1 + daily_returns)[:, None]
+        value = holdings.sum(axis=0)
+        portfolio[day] = value - 1
+        holdings /= value
+        trade = np.abs(holdings - weights).max(axis=0) > threshold
+        if day < len(returns) - 1 and trade.any():
+            turnover[day, trade] = np.abs(weights[:, trade] - holdings[:, trade]).sum(axis=0)
+            holdings[:, trade] = weights[:, trade]
+    return portfolio, turnover
+
+
+def backtest(individual_returns: pd.DataFrame, weights: Union[np.ndarray, pd.DataFrame],
+             rebalance: str = 'monthly', threshold: float = THRESHOLD, cost: float = 0.0,
+             return_turnover: bool = False) -> Union[pd.Series, pd.DataFrame, tuple]:
+    """Backtests target weights with drift between rebalancing dates and transaction costs.
+
+    The portfolio starts at the target weights. On the close of a rebalancing day it trades back
+    to them, paying `cost` times the turnover (the sum of absolute weight changes) out of that
+    day's return. With rebalance='daily' and no costs this equals `portfolio_returns`.
+
+    Args:
+        individual_returns (pd.DataFrame): Daily returns per ticker, e.g. from `process_data`.
+        weights (np.ndarray or pd.DataFrame): Target weights, or a (tickers x strategies) matrix
+            to backtest many strategies at once; DataFrame columns name the strategies.
+        rebalance (str): 'never' (buy and hold), 'daily', 'monthly', 'quarterly', 'annually' or
+            'threshold' (default is 'monthly').
+        threshold (float): For 'threshold', the absolute drift of any weight from its target
+            that triggers rebalancing (default is THRESHOLD).
+        cost (float): Transaction cost per unit traded, e.g. 0.001 for 10 basis points.
+        return_turnover (bool): Whether to also return the turnover on every day.
+
+    Raises:
+        ValueError: For an unknown schedule or weights that don't match the tickers.
+
+    Returns:
+        pd.Series or pd.DataFrame: Daily returns net of costs (a DataFrame with one column per
+            strategy for a weights matrix), plus the turnover in the same shape if requested.
+    """
+    weight_values = np.asarray(weights, dtype=float)
+    matrix = weight_values.reshape(len(weight_values), -1)
+    if len(matrix) != individual_returns.shape[1]:
+        raise ValueError(f"Expected {individual_returns.shape[1]} weights per strategy, got {len(matrix)}.")
+    returns = individual_returns.values
+
+    if rebalance == 'threshold':
+        portfolio, turnover = _threshold_backtest(returns, matrix, threshold)
+    else:
+        dates = rebalancing_dates(individual_returns.index, rebalance)
+        portfolio, turnover = _calendar_backtest(returns, matrix, dates)
+    portfolio = (1 + portfolio) * (1 - cost * turnover) - 1
+
+    if weight_values.ndim == 1:
+        results = (pd.Series(portfolio[:, 0], index=individual_returns.index),
+                   pd.Series(turnover[:, 0], index=individual_returns.index))
+    else:
+        columns = weights.columns if isinstance(weights, pd.DataFrame) else None
+        results = (pd.DataFrame(portfolio, index=individual_returns.index, columns=columns),
+                   pd.DataFrame(turnover, index=individual_returns.index, columns=columns))
+    return results if return_turnover else results[0]
@@ -0,0 +1,235 @@
+"""Runs the portfolio analysis for many portfolios at once, without prompts or windows.
+
+Meant for scheduled jobs over many client portfolios. A manifest lists the portfolios; the prices
+of all their tickers are fetched once over the union of their date ranges (through the cache and
+provider of `datafetch`), the market caps of all market-cap weighted tickers are looked up in one
+batch, and the portfolios are then evaluated in parallel worker processes. The result is a table
+with one row of metrics per portfolio, optionally with a dashboard per portfolio saved as PNG or PDF.
+
+A YAML manifest (needs PyYAML) looks like this:
+
+    portfolios:
+      - name: tech
+        tickers: [AAPL, MSFT, GOOG]
+        weights: [0.5, 0.3, 0.2]    # or 'equal', 'marketcap' or 'riskparity'
+        start: 2020-01-01
+        end: 2024-01-01
+        target_rate: 4 annually     # as typed into main.py's prompt; default 0
+
+A CSV manifest has the same columns, with tickers and weights separated by spaces.
+
+Example:
+    python batch.py portfolios.yaml --output metrics.csv --workers 8 --dashboards dashboards/
+
+Functions:
+- `load_manifest`: Reads and checks the portfolios of a YAML or CSV manifest.
+- `run_batch`: Evaluates all portfolios of a manifest and returns the metrics table.
+"""
+
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+import datafetch as df
+import future_simulation as fs
+import main
+import optimization as op
+import risk_metrics as rm
+import ticker_info as ti
+
+REQUIRED_FIELDS = ('name', 'tickers', 'start', 'end')
+
+
+def _split(value) -> list:
+    """Manifest lists come as YAML lists or as space-separated strings (CSV)."""
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return str(value).split()
+
+
+def load_manifest(path: str) -> list:
+    """Reads the portfolios of a YAML (.yaml/.yml) or CSV manifest.
+
+    Args:
+        path (str): Path of the manifest.
+
+    Raises:
+        ValueError: If a portfolio misses a field or its weights don't match its tickers.
+
+    Returns:
+        list: One dictionary per portfolio with 'name', 'tickers' (list), 'weights' (np.ndarray
+            summing to 1, or 'equal'/'marketcap'/'riskparity'), 'start', 'end' and 'target_rate' (daily decimal).
+    """
+    if path.endswith(('.yaml', '.yml')):
+        import yaml # only needed for YAML manifests
+        with open(path, encoding="utf-8") as file:
+            entries = yaml.safe_load(file)
+        if isinstance(entries, dict):
+            entries = entries.get('portfolios', [])
+    else:
+        entries = pd.read_csv(path, dtype=str, keep_default_na=False).to_dict('records')
+
+    portfolios = []
+    for entry in entries:
+        missing = [field for field in REQUIRED_FIELDS if not entry.get(field)]
+        if missing:
+            raise ValueError(f"Portfolio {entry.get('name', '?')} is missing {', '.join(missing)}.")
+
+        tickers = [ticker.upper() for ticker in _split(entry['tickers'])]
+        weights = entry.get('weights') or 'equal'
+        if isinstance(weights, str) and weights.strip().lower() in ('equal', 'marketcap', 'riskparity'):
+            weights = weights.strip().lower()
+        else:
+            weights = np.array(_split(weights), dtype=float)
+            if len(weights) != len(tickers):
+                raise ValueError(f"Portfolio {entry['name']} has {len(tickers)} tickers but {len(weights)} weights.")
+            # like get_weights in main, weights that don't add up to 1 are scaled
+            weights = weights / weights.sum()
+
+        portfolios.append({
+            'name': str(entry['name']),
+            'tickers': tickers,
+            'weights': weights,
+            # YAML turns unquoted dates into date objects
+            'start': str(entry['start']),
+            'end': str(entry['end']),
+            'target_rate': main.parse_target_rate(entry.get('target_rate') or 0),
+        })
+    return portfolios
+
+
+def _weights(portfolio: dict, individual_returns: pd.DataFrame) -> np.ndarray:
+    """The weights of a portfolio, computing equal, market-cap or risk-parity weights if asked for.
+
+    Raises:
+        ValueError: If the weights can't be computed, e.g. risk parity doesn't converge.
+    """
+    weights = portfolio['weights']
+    if isinstance(weights, str) and weights == 'equal':
+        return np.full(len(portfolio['tickers']), 1 / len(portfolio['tickers']))
+    if isinstance(weights, str) and weights == 'riskparity':
+        return op.risk_parity(individual_returns.cov())
+    if isinstance(weights, str):
+        return np.array(list(df.market_cap_weights(portfolio['tickers']).values()))
+    return weights
+
+
+def _evaluate(task: tuple) -> dict:
+    """Metrics (and dashboard) of one portfolio; top-level so it can run in a worker process."""
+    portfolio, individual_returns, weights, seed, dashboard = task
+    started = time.perf_counter()
+    row = {'name': portfolio['name']}
+    try:
+        # one simulation for the metrics and the dashboard
+        returns = df.portfolio_returns(individual_returns=individual_returns, weights=weights)
+        simulation = fs.simulate(returns, num_sim=main.NUM_SIM, num_days=main.NUM_DAYS, seed=seed)
+        row.update(main.portfolio_metrics(individual_returns, weights, portfolio['target_rate'],
+                                          simulation=simulation))
+        if dashboard is not None:
+            # the portfolios already keep the cores busy, so the panels render in this process
+            # instead of a pool per worker (which would also import Matplotlib once more per panel)
+            main.generate_dashboard(
+                returns=returns,
+                risk_contributions=rm.risk_contributions(individual_returns=individual_returns, weights=weights),
+                sharpe_ratio=row['sharpe_ratio'], sortino_ratio=row['sortino_ratio'],
+                target_rate=portfolio['target_rate'], output=dashboard, workers=1, simulation=simulation)
+            row['dashboard'] = dashboard
+    except ValueError as error:
+        row['error'] = str(error)
+    row['seconds'] = time.perf_counter() - started
+    return row
+
+
+def run_batch(portfolios: list, workers: int = None, dashboard_dir: str = None, dashboard_format: str = 'png',
+              seed: int = 0) -> pd.DataFrame:
+    """Evaluates many portfolios, fetching the shared price data only once.
+
+    A portfolio whose data or weights are unusable gets an 'error' instead of failing the batch.
+
+    Args:
+        portfolios (list): Portfolios as returned by `load_manifest`.
+        workers (int, optional): Number of worker processes; None uses all cores, 1 runs everything
+            in this process.
+        dashboard_dir (str, optional): Directory to save one dashboard per portfolio to.
+        dashboard_format (str): 'png' or 'pdf'.
+        seed (int): Seed for the Monte Carlo simulations, so reruns give the same numbers.
+
+    Returns:
+        pd.DataFrame: One row of metrics per portfolio (indexed by name), with the seconds it took.
+            Its `attrs` hold the wall time of the whole batch ('seconds') and of fetching the
+            data ('data_seconds').
+    """
+    started = time.perf_counter()
+    tickers = list(dict.fromkeys(ticker for portfolio in portfolios for ticker in portfolio['tickers']))
+    prices = df.fetch_prices(tickers, min(p['start'] for p in portfolios), max(p['end'] for p in portfolios))
+
+    # one batch of lookups fills the info cache for every market-cap weighted portfolio
+    provider = df.get_provider()
+    marketcap_tickers = [t for p in portfolios if isinstance(p['weights'], str) and p['weights'] == 'marketcap'
+                         for t in p['tickers']]
+    if marketcap_tickers:
+        ti.fetch_info(marketcap_tickers, fetcher=provider.info, host=provider.name,
+                      rate=provider.requests_per_second)
+    fetched = time.perf_counter()
+
+    if dashboard_dir is not None:
+        os.makedirs(dashboard_dir, exist_ok=True)
+
+    tasks, rows = [], []
+    for portfolio in portfolios:
+        try:
+            window = prices.loc[(prices.index >= portfolio['start']) & (prices.index < portfolio['end']),
+                                portfolio['tickers']]
+            # rows on which only other portfolios' tickers traded would become zero returns
+            individual_returns = df.returns_from_prices(window.dropna(how='all'))
+            # here rather than in the workers, which don't share the provider and its info cache
+            weights = _weights(portfolio, individual_returns)
+        except (KeyError, ValueError) as error:
+            rows.append({'name': portfolio['name'], 'error': str(error)})
+            continue
+
+        dashboard = None
+        if dashboard_dir is not None:
+            file_name = re.sub(r'[^\w.-]', '_', portfolio['name'])
+            dashboard = os.path.join(dashboard_dir, f"{file_name}.{dashboard_format}")
+        tasks.append((portfolio, individual_returns, weights, seed, dashboard))
+
+    with ProcessPoolExecutor(workers) if workers != 1 else nullcontext() as pool:
+        run = map if pool is None else pool.map
+        rows.extend(run(_evaluate, tasks))
+
+    order = {portfolio['name']: i for i, portfolio in enumerate(portfolios)}
+    metrics = pd.DataFrame(rows).sort_values('name', key=lambda names: names.map(order)).set_index('name')
+    metrics.attrs.update(seconds=time.perf_counter() - started, data_seconds=fetched - started)
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate all portfolios of a manifest without prompts.")
+    parser.add_argument('manifest', help='YAML or CSV file with the portfolios')
+    parser.add_argument('--output', default='metrics.csv', help='CSV file for the metrics (default: metrics.csv)')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: all cores)')
+    parser.add_argument('--dashboards', type=str, help='Directory to save a dashboard per portfolio to')
+    parser.add_argument('--format', choices=['png', 'pdf'], default='png', help='File format of the dashboards')
+    parser.add_argument('--simulation-seed', type=int, default=0, help='Seed for the Monte Carlo simulations')
+    parser.add_argument('--provider', choices=['yfinance', 'local', 'synthetic'], default='yfinance',
+                        help='Source of the market data (default: yfinance)')
+    parser.add_argument('--data-dir', type=str, help='Directory with <TICKER>.csv/.parquet files for --provider local')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for --provider synthetic')
+
+    arguments = parser.parse_args()
+    df.set_provider(main.get_provider(arguments))
+    metrics = run_batch(load_manifest(arguments.manifest), workers=arguments.workers,
+                        dashboard_dir=arguments.dashboards, dashboard_format=arguments.format,
+                        seed=arguments.simulation_seed)
+    metrics.to_csv(arguments.output)
+
+    elapsed = metrics.attrs['seconds']
+    print(f"{len(metrics)} portfolios in {elapsed:.1f}s (data {metrics.attrs['data_seconds']:.1f}s): "
+          f"{len(metrics) / elapsed:.2f} portfolios/s, {elapsed / max(len(metrics), 1):.3f}s per portfolio")
@@ -0,0 +1,67 @@
+"""Measures how long the metrics-only path of `main.py` takes to start and to finish.
+
+Every command runs in a fresh interpreter, as a cron job would, and the median wall time over
+`--repeats` runs is reported. Besides importing `main` and a full `--metrics-only` run on synthetic
+data (no network), it times importing the plotting and SciPy modules that the metrics-only path
+no longer loads, for comparison.
+
+Example:
+    python benchmark_startup.py --repeats 7
+
+Functions:
+- `time_command`: Median wall time of a command over several runs.
+- `run_benchmark`: Times the startup of the metrics-only path and the skipped imports.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+METRICS_ARGUMENTS = ['--metrics-only', '--provider', 'synthetic', '--start', '2023-01-01',
+                     '--end', '2023-12-31', 'T1', 'T2', 'T3'] # synthetic, so no network in the timing
+SKIPPED_IMPORTS = 'import matplotlib.pyplot, scipy.stats, visualization' # what the dashboard path loads on top
+
+
+def time_command(command: list, repeats: int = 5) -> float:
+    """Median wall time in seconds of running `command` `repeats` times.
+
+    Raises:
+        subprocess.CalledProcessError: If the command fails.
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=HERE, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run_benchmark(repeats: int = 5) -> dict:
+    """Times the startup of the metrics-only path and, for comparison, the imports it skips.
+
+    Args:
+        repeats (int): Runs per command; the median is reported.
+
+    Returns:
+        dict: Description -> median seconds.
+    """
+    commands = {
+        'python (empty)': [sys.executable, '-c', 'pass'],
+        'import main': [sys.executable, '-c', 'import main'],
+        'main.py --metrics-only': [sys.executable, 'main.py', *METRICS_ARGUMENTS],
+        'plotting and scipy imports': [sys.executable, '-c', SKIPPED_IMPORTS],
+    }
+    return {name: time_command(command, repeats=repeats) for name, command in commands.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Startup time of the metrics-only path of main.py.')
+    parser.add_argument('--repeats', type=int, default=5, help='Runs per command (default is 5)')
+    arguments = parser.parse_args()
+
+    for name, seconds in run_benchmark(repeats=arguments.repeats).items():
+        print(f"{name:<28}{seconds:8.3f} s")
@@ -0,0 +1,142 @@
+"""Covariance estimates for large universes, kept in low-rank-plus-diagonal form.
+
+With thousands of tickers and a few hundred days, the sample covariance `individual_returns.cov()`
+is a huge N x N matrix that is singular and noisy. The estimates here are all of the form
+B B' + diag(d), with N x k loadings B, and are stored that way in a `LowRankCovariance`:
+multiplying it with weights costs O(N * k) time and it takes O(N * k) memory, so the portfolio
+variance and the contributions to risk never need the N x N matrix.
+
+- `pca_covariance` keeps the k largest principal components of the returns as factors and puts
+  the rest of each asset's variance on the diagonal (a statistical k-factor model).
+- `ledoit_wolf` shrinks the sample covariance towards a multiple of the identity matrix with the
+  Ledoit-Wolf (2004) intensity. The sample covariance of T days is X'X / T with the T x N demeaned
+  returns X, i.e. rank T, so the shrunk matrix is also low-rank-plus-diagonal; the intensity is
+  computed from the T x T Gram matrix instead of the N x N matrix.
+
+Functions:
+- `pca_covariance`: Statistical factor model with `num_factors` principal components.
+- `ledoit_wolf`: Ledoit-Wolf shrinkage towards the scaled identity.
+
+Classes:
+- `LowRankCovariance`: A covariance matrix B B' + diag(d) that is never materialised.
+"""
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+
+class LowRankCovariance:
+    """Covariance matrix B B' + diag(d) that only stores B (N x k) and d (N).
+
+    `cov @ weights` works as with a NumPy matrix (for one portfolio or a tickers x portfolios
+    matrix), so e.g. `risk_metrics.risk_contributions` accepts it through `cov=`.
+
+    Parameters:
+        loadings (np.ndarray): Factor loadings B (shape: assets x factors).
+        specific (np.ndarray): Variance per asset that the factors don't explain, d.
+        index (pd.Index, optional): Tickers of the assets.
+    """
+
+    def __init__(self, loadings: np.ndarray, specific: np.ndarray, index: pd.Index = None):
+        self.loadings = np.asarray(loadings, dtype=float)
+        self.specific = np.asarray(specific, dtype=float)
+        self.index = index
+
+    @property
+    def shape(self) -> tuple:
+        """Shape of the (never materialised) covariance matrix."""
+        return (len(self.specific), len(self.specific))
+
+    @property
+    def num_factors(self) -> int:
+        """Number of factors, k."""
+        return self.loadings.shape[1]
+
+    def __matmul__(self, weights: np.ndarray) -> np.ndarray:
+        weights = np.asarray(weights, dtype=float)
+        specific = self.specific if weights.ndim == 1 else self.specific[:, None]
+        return self.loadings @ (self.loadings.T @ weights) + specific * weights
+
+    def diagonal(self) -> np.ndarray:
+        """Variance of every asset."""
+        return np.einsum('ij,ij->i', self.loadings, self.loadings) + self.specific
+
+    def variance(self, weights: np.ndarray) -> Union[float, np.ndarray]:
+        """Portfolio variance w'Cw, for one portfolio or a tickers x portfolios matrix."""
+        weights = np.asarray(weights, dtype=float)
+        return np.sum(weights * (self @ weights), axis=0)
+
+    def to_frame(self) -> pd.DataFrame:
+        """The full N x N matrix, e.g. to compare with the sample covariance (O(N^2) memory)."""
+        return pd.DataFrame(self.loadings @ self.loadings.T + np.diag(self.specific),
+                            index=self.index, columns=self.index)
+
+
+def _demeaned(individual_returns: pd.DataFrame) -> np.ndarray:
+    returns = np.asarray(individual_returns, dtype=float)
+    if np.isnan(returns).any():
+        raise ValueError("Returns contain NaN values.")
+    return returns - returns.mean(axis=0)
+
+
+def pca_covariance(individual_returns: pd.DataFrame, num_factors: int = 5) -> LowRankCovariance:
+    """Statistical factor model: the largest principal components plus specific variances.
+
+    The loadings come from a thin SVD of the T x N demeaned returns, so the N x N sample covariance
+    is never formed. The diagonal keeps each asset's sample variance exactly.
+
+    Args:
+        individual_returns (pd.DataFrame): Daily returns per ticker, e.g. from `process_data`.
+        num_factors (int): Number of principal components k (default is 5).
+
+    Raises:
+        ValueError: If there are NaN values or `num_factors` isn't between 1 and min(T - 1, N).
+
+    Returns:
+        LowRankCovariance: The covariance estimate (with ddof=1 like `DataFrame.cov`).
+    """
+    returns = _demeaned(individual_returns)
+    num_days, num_assets = returns.shape
+    if not 1 <= num_factors <= min(num_days - 1, num_assets):
+        raise ValueError(f"num_factors must be between 1 and {min(num_days - 1, num_assets)}.")
+
+    _, singular_values, components = np.linalg.svd(returns, full_matrices=False)
+    loadings = components[:num_factors].T * (singular_values[:num_factors] / np.sqrt(num_days - 1))
+    variances = np.einsum('ij,ij->j', returns, returns) / (num_days - 1)
+    specific = np.maximum(variances - np.einsum('ij,ij->i', loadings, loadings), 0.0)
+    return LowRankCovariance(loadings, specific, index=getattr(individual_returns, 'columns', None))
+
+
+def ledoit_wolf(individual_returns: pd.DataFrame) -> tuple:
+    """Ledoit-Wolf shrinkage of the sample covariance towards a multiple of the identity matrix.
+
+    Returns (1 - shrinkage) * S + shrinkage * mu * I, where S is the sample covariance (divided by
+    T, as in the paper), mu its average variance and the shrinkage intensity minimises the expected
+    squared error. All sums over N x N entries are computed from the T x T Gram matrix.
+
+    Args:
+        individual_returns (pd.DataFrame): Daily returns per ticker, e.g. from `process_data`.
+
+    Raises:
+        ValueError: If there are NaN values.
+
+    Returns:
+        tuple: The covariance estimate (LowRankCovariance with one factor per day) and the
+            shrinkage intensity between 0 and 1.
+    """
+    returns = _demeaned(individual_returns)
+    num_days, num_assets = returns.shape
+
+    gram = returns @ returns.T # T x T
+    squared_norms = np.diag(gram) # |x_t|^2
+    mu = squared_norms.sum() / (num_days * num_assets)
+    # |S|_F^2 = |X X'|_F^2 / T^2, and sum_t |x_t x_t' - S|_F^2 = sum_t |x_t|^4 - T |S|_F^2
+    sample_norm = np.sum(gram ** 2) / num_days ** 2
+    dispersion = sample_norm - mu ** 2 * num_assets
+    error = (np.sum(squared_norms ** 2) - num_days * sample_norm) / num_days ** 2
+    shrinkage = 1.0 if dispersion <= 0 else min(error, dispersion) / dispersion
+
+    loadings = returns.T * np.sqrt((1 - shrinkage) / num_days)
+    specific = np.full(num_assets, shrinkage * mu)
+    return LowRankCovariance(loadings, specific, index=getattr(individual_returns, 'columns', None)), shrinkage
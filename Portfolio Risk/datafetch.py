@@ -1,12 +1,17 @@
 """A set of helper functions to get and process data for financial portfolios.
 
 Functions for analyzing financial portfolios using stock price data and custom weights. 
-The functions use the yFinance library to fetch data and perform calculations for daily
-portfolio returns and cumulative returns.
+The functions get their data from a market-data provider (yFinance by default, see `providers`)
+and perform calculations for daily portfolio returns and cumulative returns.
 
 Functions:
+- `set_provider`: Replaces the default market-data provider, e.g. with an offline one.
+- `get_provider`: Returns the current default market-data provider.
 - `is_valid_ticker`: Checks if a given string is a valid stock ticker.
+- `valid_tickers`: Checks a list of tickers at once and returns the valid ones.
+- `fetch_prices`: Gets adjusted close prices, downloading only what isn't in the local cache yet.
 - `process_data`: Downloads and preprocesses historical price data for a list of tickers.
+- `returns_from_prices`: Preprocesses adjusted closes into daily returns (used by `process_data`).
 - `get_target_rate`: User input for target rate of return for calculation of Sharpe/Sortino ratio.
 - `market_cap_weights`: Calculates portfolio weights from market capitalizations (or equal weights).
 - `portfolio_returns`: Computes daily portfolio returns from individual stock returns and weights.
@@ -16,48 +21,167 @@ Raises:
         ValueError: If the data can't be fetched properly or there are no tickers to fetch for.
 """
 
+import os
 from typing import Union
-import yfinance as yf
 import pandas as pd
 import numpy as np
 
-def is_valid_ticker(ticker: str) -> bool:
+import price_cache as pc
+import providers
+import ticker_info as ti
+
+# adjusted closes are cached here across runs; pass cache_dir=None to always download
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "portfolio_risk")
+
+_PROVIDER = providers.YFinanceProvider()
+
+
+def set_provider(provider: providers.MarketDataProvider):
+    """Replaces the provider used whenever a function isn't given one explicitly.
+
+    Args:
+        provider (providers.MarketDataProvider): E.g. `providers.SyntheticProvider()`.
+    """
+    global _PROVIDER # pylint: disable=global-statement
+    _PROVIDER = provider
+
+
+def get_provider() -> providers.MarketDataProvider:
+    """Returns the provider used whenever a function isn't given one explicitly."""
+    return _PROVIDER
+
+
+def is_valid_ticker(ticker: str, provider: providers.MarketDataProvider = None) -> bool:
     """Check if the given string is a valid stock ticker by retrieving some data.
     
     Args:
         ticker (str): The stock symbol to be checked.
+        provider (providers.MarketDataProvider, optional): Data source; defaults to `get_provider()`.
     
     Returns:
         bool: Whether the symbol passed the checks.    
     """
-    try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        return 'country' in info and info['country'] is not None
-    except (ValueError, KeyError, IndexError):
-        return False
+    return valid_tickers([ticker], provider=provider) == [ticker]
 
 
-def process_data(tickers: list, start_date: str, end_date: str) -> pd.DataFrame:
+def valid_tickers(tickers: list, provider: providers.MarketDataProvider = None) -> list:
+    """Checks many tickers at once with concurrent lookups and returns the valid ones.
+
+    Args:
+        tickers (list): The stock symbols to be checked.
+        provider (providers.MarketDataProvider, optional): Data source; defaults to `get_provider()`.
+
+    Returns:
+        list: The symbols that passed the checks, in their original order.
+    """
+    provider = provider or _PROVIDER
+    infos = ti.fetch_info(tickers, fetcher=provider.info, host=provider.name,
+                          rate=provider.requests_per_second)
+    return [ticker for ticker in tickers if infos[ticker].get('country') is not None]
+
+
+def fetch_prices(tickers: list, start_date: str, end_date: str, cache_dir: str = CACHE_DIR,
+                 provider: providers.MarketDataProvider = None) -> pd.DataFrame:
+    """Gets adjusted close prices for a list of tickers, served from the local cache if possible.
+
+    Only the date ranges and tickers that aren't cached yet are downloaded (plus a few days of
+    overlap to catch splits and dividends since the last download, see `price_cache`); tickers
+    that miss the same range share one download. A ticker whose cached closes turn out to be
+    adjusted differently is downloaded again for the whole range. Everything else is read from
+    memory-mapped files. Providers that are local anyway (see `MarketDataProvider.cacheable`)
+    skip the cache.
+
+    Args:
+        tickers (list): A list of stock ticker symbols (e.g., ['AAPL', 'MSFT']).
+        start_date (str): The start date for the data fetch in 'YYYY-MM-DD' format.
+        end_date (str): The end date for the data fetch in 'YYYY-MM-DD' format (exclusive).
+        cache_dir (str): Directory of the price cache; None downloads everything every time.
+        provider (providers.MarketDataProvider, optional): Data source; defaults to `get_provider()`.
+
+    Raises:
+        ValueError: If a ticker's cached closes had to be dropped and downloading the whole
+            range again returns nothing.
+
+    Returns:
+        pd.DataFrame: Adjusted closes indexed by date with one column per ticker, in the
+            order of `tickers` (may contain NaN values).
+    """
+    provider = provider or _PROVIDER
+    if cache_dir is None or not provider.cacheable:
+        return provider.prices(tickers, start_date, end_date).reindex(columns=tickers)
+
+    # one cache per provider so their prices never mix
+    cache_dir = os.path.join(cache_dir, provider.name)
+    index = pc.read_index(cache_dir)
+    to_fetch = {}
+    for ticker in tickers:
+        for date_range in pc.missing_ranges(index, ticker, start_date, end_date):
+            to_fetch.setdefault(date_range, []).append(ticker)
+
+    dropped = []
+    for (range_start, range_end), group in to_fetch.items():
+        fetch = provider.prices(group, range_start, range_end)
+        # nothing came back at all (e.g. no connection), don't mark the range as covered
+        if fetch.empty:
+            continue
+        dropped += pc.store_prices(cache_dir, fetch.reindex(columns=group), range_start, range_end)
+
+    # the cache of these only holds the range just fetched now, the rest of the request would be
+    # missing (and back-filled into fake zero returns later), so fetch all of it on the new basis
+    dropped = list(dict.fromkeys(dropped))
+    if dropped:
+        fetch = provider.prices(dropped, start_date, end_date).reindex(columns=dropped)
+        failed = [ticker for ticker in dropped if fetch[ticker].dropna().empty]
+        if failed:
+            raise ValueError(f"The cached prices of {', '.join(failed)} were adjusted differently "
+                             f"and could not be downloaded again.")
+        pc.store_prices(cache_dir, fetch, start_date, end_date)
+
+    prices = [pc.load_prices(cache_dir, ticker, start_date, end_date) for ticker in tickers]
+    return pd.concat(prices, axis=1).sort_index()
+
+
+def process_data(tickers: list, start_date: str, end_date: str, cache_dir: str = CACHE_DIR,
+                 provider: providers.MarketDataProvider = None) -> pd.DataFrame:
     """Fetches and preprocesses adjusted close price data for a list of tickers.
 
     Args:
         tickers (list): A list of stock ticker symbols (e.g., ['AAPL', 'MSFT']).
         start_date (str): The start date for the data fetch in 'YYYY-MM-DD' format.
         end_date (str): The end date for the data fetch in 'YYYY-MM-DD' format.
+        cache_dir (str): Directory of the price cache; None downloads everything every time.
+        provider (providers.MarketDataProvider, optional): Data source; defaults to `get_provider()`.
 
     Raises:
         ValueError: If the fetched data contains NaN values after preprocessing
                     or if the data is empty.
 
     Returns:
-        pd.DataFrame: A DataFrame containing day-over-day percentage returns for each ticker.
+        pd.DataFrame: A DataFrame containing day-over-day percentage returns for each ticker,
+            with the columns in the order of `tickers`.
     """
 
-    fetch = yf.download(tickers, start=start_date, end=end_date)['Adj Close']
+    fetch = fetch_prices(tickers, start_date, end_date, cache_dir=cache_dir, provider=provider)
+    return returns_from_prices(fetch)
+
+
+def returns_from_prices(prices: pd.DataFrame) -> pd.DataFrame:
+    """Fills gaps in adjusted close prices and turns them into daily returns.
 
+    Split out of `process_data` so prices fetched once for many portfolios (see `batch`) can be
+    preprocessed per portfolio exactly the same way.
+
+    Args:
+        prices (pd.DataFrame): Adjusted closes indexed by date, one column per ticker.
+
+    Raises:
+        ValueError: If the data contains NaN values after preprocessing or if it is empty.
+
+    Returns:
+        pd.DataFrame: Day-over-day percentage returns for each ticker.
+    """
     # double filling to also get initial NaN values
-    data = fetch.fillna(method='ffill').fillna(method='bfill')
+    data = prices.ffill().bfill()
     if data.isnull().values.any():
         raise ValueError("Data contains NaN values after preprocessing.")
     if data.empty:
@@ -68,16 +192,17 @@ def process_data(tickers: list, start_date: str, end_date: str) -> pd.DataFrame:
     return returns
 
 
-def market_cap_weights(tickers: list) -> dict:
+def market_cap_weights(tickers: list, provider: providers.MarketDataProvider = None) -> dict:
     """Calculates market capitalization-based weights for a portfolio of stocks.
 
-    Retrieves the market capitalization for each ticker using 
-    the yFinance library. If any market cap is missing, it defaults to the 
+    Retrieves the market capitalization for all tickers at once with concurrent lookups
+    at the market-data provider. If any market cap is missing, it defaults to the 
     average market cap of the other tickers. If all market caps are missing, 
     equal weights are assigned to all tickers.
 
     Parameters:
         tickers (list): A list of stock ticker symbols (e.g., ['AAPL', 'MSFT']).
+        provider (providers.MarketDataProvider, optional): Data source; defaults to `get_provider()`.
 
     Returns:
         dict: A dictionary where keys are ticker symbols and values are their 
@@ -90,11 +215,10 @@ def market_cap_weights(tickers: list) -> dict:
     if not tickers:
         raise ValueError("Ticker list cannot be empty.")
 
-    market_caps = {}
+    provider = provider or _PROVIDER
     weights = {}
-    for ticker in tickers:
-        stock = yf.Ticker(ticker)
-        market_caps[ticker] = stock.info.get('marketCap', 0)
+    market_caps = ti.market_caps(tickers, fetcher=provider.info, host=provider.name,
+                                 rate=provider.requests_per_second)
 
     average_market_cap = np.sum(list(market_caps.values())) / len(tickers)
 
@@ -117,24 +241,36 @@ def market_cap_weights(tickers: list) -> dict:
     return weights
 
 
-def portfolio_returns(tickers: list, start_date: str, end_date: str, weights: np.ndarray) -> pd.Series:
+def portfolio_returns(tickers: list = None, start_date: str = None, end_date: str = None,
+                      weights: np.ndarray = None, individual_returns: pd.DataFrame = None) -> pd.Series:
     """Computes the daily returns of a portfolio of stocks.
 
     Processes historical price data for the given tickers, gets their daily returns, and 
-    aggregates them into portfolio-level returns based on provided weights. If no weights 
-    are provided, the function defaults to using market capitalization weights or equal weights.
+    aggregates them into portfolio-level returns based on provided weights. If the individual
+    returns were already computed by `process_data`, they can be passed in instead of the
+    tickers and dates so nothing is fetched or preprocessed a second time.
 
     Parameters:
         tickers (list): A list of stock ticker symbols (e.g., ['AAPL', 'MSFT']).
         start_date (str): The start date for the historical data in 'YYYY-MM-DD' format.
         end_date (str): The end date for the historical data in 'YYYY-MM-DD' format.
-        weights (np.ndarray): An array of weights corresponding to the tickers.
+        weights (np.ndarray): An array of weights corresponding to the tickers, or a
+            (tickers x portfolios) matrix to get the returns of many portfolios at once.
+        individual_returns (pd.DataFrame, optional): Daily returns per ticker from `process_data`;
+            if given, `tickers`, `start_date` and `end_date` are ignored.
 
     Returns:
-        pd.Series: A time series of the portfolio day-over-day returns indexed by date.
+        pd.Series: A time series of the portfolio day-over-day returns indexed by date
+            (a DataFrame with one column per portfolio for a weights matrix).
+
+    Raises:
+        ValueError: If neither the individual returns nor tickers and dates are given.
     """
 
-    individual_returns = process_data(tickers, start_date, end_date)
+    if individual_returns is None:
+        if not tickers or start_date is None or end_date is None:
+            raise ValueError("Either individual returns or tickers and dates are required.")
+        individual_returns = process_data(tickers, start_date, end_date)
     returns = individual_returns.dot(weights)
     return returns
 
@@ -16,23 +16,33 @@ Key Features:
 
 Example:
     python main.py --start 2023-01-01 --end 2023-12-31 AAPL MSFT GOOGL
+
+Without network access, e.g. for profiling, the data can come from local files or be generated:
+    python main.py --provider synthetic --start 2004-01-01 --end 2024-01-01 T1 T2 T3
+
+For many portfolios without any prompts or windows, see `batch.py`.
+
+For just the numbers, e.g. in a cron job, `--metrics-only` skips the prompts and the dashboard
+and prints the metrics as JSON. Plotting (Matplotlib, tkinter) and SciPy are only imported where
+they're used, so that path starts in a fraction of the time; `benchmark_startup.py` measures it:
+    python main.py --metrics-only --start 2023-01-01 --end 2023-12-31 --weights equal AAPL MSFT
 """
 
 import argparse
+import json
 from datetime import datetime
-import tkinter as tk
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 
 import datafetch as df
 import future_simulation as fs
+import providers
 import risk_metrics as rm
-import visualization as vis
 
 CONFIDENCE_LEVEL = 0.95 # for C/VaR calculations
 METHOD = 'historical' # method vor VaR calculation, 'parametric' is the other option
+ATTRIBUTION = 'volatility' # risk split up in the pie chart, 'cvar' for the tail risk instead
 
 NUM_SIM = 10000 # number of simulations when generating future returns
 NUM_DAYS = 252 # for simulating future returns
@@ -42,6 +52,9 @@ UPPER_PCT = 95
 
 YEAR_DAYS = 252 # for converting from annual to daily rate
 
+DASHBOARD_SIZE = (20, 24) # inches, for dashboards saved to a file (or without a screen)
+DASHBOARD_DPI = 100
+
 def main(tickers: list, start_date: str, end_date: str):
     """Executes the main workflow for portfolio analysis.
 
@@ -58,77 +71,226 @@ def main(tickers: list, start_date: str, end_date: str):
         5. Computes Sharpe and Sortino ratios based on the target rate.
         6. Generates a comprehensive dashboard with all calculated metrics and visualizations.
     """
+    # fetched and preprocessed once; everything below derives from this frame
     individual_returns = df.process_data(tickers=tickers, start_date=start_date, end_date=end_date)
     
-    weights = get_weights(tickers=tickers)
-    returns = df.portfolio_returns(tickers=tickers, start_date=start_date, end_date=end_date, weights=weights)
+    weights = get_weights(tickers=tickers, individual_returns=individual_returns)
+    returns = df.portfolio_returns(individual_returns=individual_returns, weights=weights)
 
     target_rate = get_target_rate()
     risk_contributions = rm.risk_contributions(individual_returns=individual_returns, weights=weights)
+    tail_contributions = None
+    if ATTRIBUTION == 'cvar':
+        tail_contributions = rm.tail_risk_contributions(individual_returns, weights, confidence_level=CONFIDENCE_LEVEL)
     sharpe_ratio = rm.sharpe_ratio(returns=returns, target_rate=target_rate)
     sortino_ratio = rm.sortino_ratio(returns=returns, target_rate=target_rate)
     
     generate_dashboard(returns=returns,
                        risk_contributions=risk_contributions,
+                       tail_contributions=tail_contributions,
                        sharpe_ratio=sharpe_ratio,
                        sortino_ratio=sortino_ratio,
                        target_rate=target_rate)
     
 
-def generate_dashboard(returns: pd.Series, risk_contributions: pd.DataFrame, sharpe_ratio: float, sortino_ratio: float, target_rate: float):
+def generate_dashboard(returns: pd.Series, risk_contributions: pd.DataFrame, sharpe_ratio: float, sortino_ratio: float, target_rate: float,
+                       output: str = None, seed: int = None, workers: int = None,
+                       tail_contributions: pd.DataFrame = None, simulation: fs.SimulationResult = None):
     """
     Generates a dashboard for portfolio analysis, dynamically adjusting the size to fit the screen.
 
+    With `output`, nothing is shown: the panels are rendered off-screen (Agg) at DASHBOARD_SIZE,
+    in parallel processes, and written to the file. That needs neither a display nor tkinter.
+
     Args:
         returns (pd.Series): Portfolio returns over time.
         risk_contributions (pd.DataFrame): DataFrame with risk contributions per asset.
         sharpe_ratio (float): The portfolio's Sharpe ratio.
         sortino_ratio (float): The portfolio's Sortino ratio.
         target_rate: (float): The target rate; e.g. the risk-free rate.
+        output (str, optional): File to save the dashboard to instead of showing it, e.g.
+            'dashboard.png' or 'dashboard.pdf'. Needs no display, so it works in batch jobs.
+        seed (int, optional): Seed for the simulated future returns.
+        workers (int, optional): Processes rendering the panels for `output`; None uses one per
+            panel up to the number of cores.
+        tail_contributions (pd.DataFrame, optional): Component VaR/CVaR per asset from
+            `tail_risk_contributions`; if given, the pie splits up the CVaR instead of the volatility.
+        simulation (fs.SimulationResult, optional): Simulated future returns, e.g. the ones of
+            `portfolio_metrics`; simulated with `seed` if not given.
+    """
+    # plotting is the slowest import by far, so it waits until a dashboard is actually drawn
+    import matplotlib.pyplot as plt
+    import visualization as vis
+
+    var = rm.value_at_risk(returns, confidence_level=CONFIDENCE_LEVEL, method=METHOD)
+    cvar = rm.conditional_value_at_risk(returns, confidence_level=CONFIDENCE_LEVEL)
+
+    # one simulation (and one cumprod) for the metrics and both plots
+    if simulation is None:
+        simulation = fs.simulate(returns, num_sim=NUM_SIM, num_days=NUM_DAYS, seed=seed)
+    metrics = fs.monte_carlo_var(simulation, confidence_level=CONFIDENCE_LEVEL)
+
+    sharpe_sortino_text = f"Sharpe Ratio: {sharpe_ratio:.2f}\nSortino Ratio: {sortino_ratio:.2f}\
+        \nTarget rate daily: {target_rate:.4%}\nTarget rate annual: {(1+target_rate)**252 - 1:.2%}"
+
+    if tail_contributions is None:
+        pie = (vis.pie_risk_contributions, (risk_contributions["Normalized contribution"],), {},
+               "Risk Contributions by Asset")
+    else:
+        pie = (vis.pie_risk_contributions, (tail_contributions["CVaR share"],), {},
+               f"CVaR ({CONFIDENCE_LEVEL:.0%}) Contributions by Asset")
+
+    # (plot function, args, kwargs, title), row by row
+    panels = [
+        pie,
+        (text_panel, (sharpe_sortino_text,), {}),
+        (vis.plot_historical_returns, (returns,), {}),
+        (vis.plot_cumulative_returns, (returns,), {}),
+        (vis.plot_drawdowns, (returns,), {}),
+        (vis.plot_var_cvar, (returns, var, cvar), {}),
+        (vis.plot_simulations, (simulation, metrics['daily']['VaR'], metrics['daily']['CVaR']),
+         {'num_paths': 3}),
+        (vis.plot_simulations_cumulative, (simulation, metrics['cumulative']['CVaR']),
+         {'lower_pct': LOWER_PCT, 'upper_pct': UPPER_PCT}),
+    ]
+
+    if output is not None:
+        panel_size = (DASHBOARD_SIZE[0] / 2, DASHBOARD_SIZE[1] / 4)
+        vis.save_panels(panels, output, ncols=2, size=panel_size, dpi=DASHBOARD_DPI, workers=workers)
+        return
+
+    _, axs = plt.subplots(4, 2, figsize=screen_figsize())
+    for (function, args, kwargs, *title), axes in zip(panels, axs.flat):
+        function(*args, axes=axes, **kwargs)
+        if title:
+            axes.set_title(title[0])
+
+    plt.tight_layout(rect=[0, 0.05, 1, 1])  # ensures no overlap
+    plt.show()
+
+
+def portfolio_metrics(individual_returns: pd.DataFrame, weights: np.ndarray, target_rate: float,
+                      seed: int = None, simulation: fs.SimulationResult = None) -> dict:
+    """Computes the metrics the dashboard shows for one portfolio, without plotting anything.
+
+    Args:
+        individual_returns (pd.DataFrame): Daily returns of the portfolio's stocks.
+        weights (np.ndarray): Portfolio weights.
+        target_rate (float): Daily target rate for the Sharpe and Sortino ratios.
+        seed (int, optional): Seed for the Monte Carlo simulation.
+        simulation (fs.SimulationResult, optional): Simulated future portfolio returns to use
+            instead of simulating them with `seed`, e.g. to share them with `generate_dashboard`.
+
+    Returns:
+        dict: Ratios, historical and simulated C/VaR, and the maximum drawdown.
+    """
+    returns = df.portfolio_returns(individual_returns=individual_returns, weights=weights)
+    if simulation is None:
+        simulation = fs.simulate(returns, num_sim=NUM_SIM, num_days=NUM_DAYS, seed=seed)
+    simulated = fs.monte_carlo_var(simulation, confidence_level=CONFIDENCE_LEVEL)
+    return {
+        'days': len(returns),
+        'sharpe_ratio': rm.sharpe_ratio(returns, target_rate=target_rate),
+        'sortino_ratio': rm.sortino_ratio(returns, target_rate=target_rate),
+        'var': rm.value_at_risk(returns, confidence_level=CONFIDENCE_LEVEL, method=METHOD),
+        'cvar': rm.conditional_value_at_risk(returns, confidence_level=CONFIDENCE_LEVEL),
+        'max_drawdown': rm.drawdowns(returns).min(),
+        'simulated_daily_var': simulated['daily']['VaR'],
+        'simulated_daily_cvar': simulated['daily']['CVaR'],
+        'simulated_cumulative_var': simulated['cumulative']['VaR'],
+        'simulated_cumulative_cvar': simulated['cumulative']['CVaR'],
+    }
+
+
+def parse_weights(text: str, tickers: list, individual_returns: pd.DataFrame) -> np.ndarray:
+    """Turns 'equal', 'marketcap', 'riskparity' or space-separated numbers into weights.
+
+    Like `get_weights`, but from a string instead of prompts; numbers are scaled to sum to 1.
+
+    Raises:
+        ValueError: If there isn't one number per ticker.
+    """
+    specification = text.strip().lower()
+    if specification == 'equal':
+        return np.full(len(tickers), 1 / len(tickers))
+    if specification == 'marketcap':
+        return np.array(list(df.market_cap_weights(tickers).values()))
+    if specification == 'riskparity':
+        import optimization as op # needs SciPy
+        return op.risk_parity(individual_returns.cov())
+    try:
+        weights = np.array(specification.replace(',', ' ').split(), dtype=float)
+    except ValueError:
+        raise ValueError("Weights must be 'equal', 'marketcap', 'riskparity' or numbers.") from None
+    if len(weights) != len(tickers):
+        raise ValueError(f"{len(tickers)} tickers but {len(weights)} weights.")
+    return weights / weights.sum()
+
+
+def metrics_only(tickers: list, start_date: str, end_date: str, weights: str = 'equal',
+                 target_rate: str = '0', seed: int = None) -> dict:
+    """The metrics of one portfolio without prompts or plots, ready for JSON.
+
+    Args:
+        tickers (list[str]): Stock ticker symbols of the portfolio.
+        start_date (str): The start date for the portfolio's historical data.
+        end_date (str): The end date for the portfolio's historical data.
+        weights (str): 'equal', 'marketcap', 'riskparity' or one number per ticker.
+        target_rate (str): Target rate as typed into the prompt, e.g. '0.01' or '4 annually'.
+        seed (int, optional): Seed for the Monte Carlo simulation.
+
+    Returns:
+        dict: The portfolio, its weights and the metrics of `portfolio_metrics` as plain floats;
+            undefined metrics (e.g. the Sortino Ratio without a day below the target) are None,
+            since NaN isn't valid JSON.
     """
-    # limiting the window size
-    root = tk.Tk()
+    individual_returns = df.process_data(tickers=tickers, start_date=start_date, end_date=end_date)
+    weight_values = parse_weights(weights, list(individual_returns.columns), individual_returns)
+    daily_rate = parse_target_rate(target_rate)
+    metrics = portfolio_metrics(individual_returns, weight_values, daily_rate, seed=seed)
+    return {
+        'tickers': list(individual_returns.columns),
+        'start': start_date,
+        'end': end_date,
+        'weights': dict(zip(individual_returns.columns, map(float, weight_values))),
+        'target_rate': daily_rate,
+        **{name: int(value) if name == 'days' else float(value) if np.isfinite(value) else None
+           for name, value in metrics.items()},
+    }
+
+
+def text_panel(text: str, axes):
+    """Writes text in the upper left corner of an otherwise blank panel (the ratios of the dashboard)."""
+    axes.axis("off")  # blanking the outer rectangle
+    axes.text(
+        0, 0.75, # text in upper left corner
+        text,
+        fontsize=16, fontweight="bold")
+    return axes
+
+
+def screen_figsize() -> tuple:
+    """Figure size in inches that fits the screen, or DASHBOARD_SIZE if there is no display."""
+    try:
+        import tkinter as tk # only needed to read the screen size
+    except ImportError:
+        return DASHBOARD_SIZE
+    try:
+        root = tk.Tk()
+    except tk.TclError: # e.g. no $DISPLAY on a server
+        return DASHBOARD_SIZE
     screen_width = root.winfo_screenwidth()
     screen_height = root.winfo_screenheight()
-    
+    root.destroy()
+
     screen_width_in = screen_width / 96
     screen_height_in = screen_height / 96
-    
+
     scaling_factor = 0.9
     fig_width = min(screen_width_in * scaling_factor, 20)
     fig_height = min(screen_height_in * scaling_factor, 30)
-    
-    _, axs = plt.subplots(4, 2, figsize=(fig_width, fig_height))
-    
-    # plotting
-    vis.pie_risk_contributions(risk_contributions["Normalized contribution"], axs[0, 0])
-    axs[0, 0].set_title("Risk Contributions by Asset")
-    
-    axs[0, 1].axis("off")  # blanking the outer rectangle
-    sharpe_sortino_text = f"Sharpe Ratio: {sharpe_ratio:.2f}\nSortino Ratio: {sortino_ratio:.2f}\
-        \nTarget rate daily: {target_rate:.4%}\nTarget rate annual: {(1+target_rate)**252 - 1:.2%}"
-    axs[0, 1].text(
-        0, 0.75, # text in upper left corner
-        sharpe_sortino_text,
-        fontsize=16, fontweight="bold")
-    
-    vis.plot_historical_returns(returns, axes=axs[1, 0])
-    vis.plot_cumulative_returns(returns, axes=axs[1, 1])
-    vis.plot_drawdowns(returns, axes=axs[2, 0])
-    
-    var = rm.value_at_risk(returns, confidence_level=CONFIDENCE_LEVEL, method=METHOD)
-    cvar = rm.conditional_value_at_risk(returns, confidence_level=CONFIDENCE_LEVEL)
-    vis.plot_var_cvar(returns, var, cvar, axes=axs[2, 1])
-    
-    metrics = fs.monte_carlo_var(returns, num_sim=NUM_SIM, num_days=NUM_DAYS, confidence_level=CONFIDENCE_LEVEL)
-    projection = fs.simulate_future_returns(returns, num_sim=NUM_SIM, num_days=NUM_DAYS)
-    vis.plot_simulations(projection, metrics['daily']['VaR'], metrics['daily']['CVaR'],
-                         num_paths=3, axes=axs[3, 0])
-    vis.plot_simulations_cumulative(projection, metrics['cumulative']['CVaR'],
-                                    lower_pct=LOWER_PCT, upper_pct=UPPER_PCT, axes=axs[3, 1])
-    
-    plt.tight_layout(rect=[0, 0.05, 1, 1])  # ensures no overlap
-    plt.show()
+    return fig_width, fig_height
+
 
 def get_tickers(args) -> list:
     """Prompts the user to input stock tickers or retrieves them from command line.
@@ -169,32 +331,54 @@ def get_target_rate() -> float:
     while True:
         try:
             # Prompt the user for input
-            rate_input = input(
+            return parse_target_rate(input(
                 "Enter the target rate as a percentage (0.1 for 0.1%) for Sharpe/Sortino calculations:\n"
                 "Use keywords 'yearly' or 'annually' after the rate if it's not a daily rate: "
-            ).split()
-            
-            rate = float(rate_input[0]) / 100  # percentage to decimal
-            
-            if len(rate_input) == 1:
-                return rate
-            
-            if rate_input[1].lower() in ['yearly', 'annually']:
-                return (1 + rate) ** (1 / YEAR_DAYS) - 1  # annual to daily
-            
-            print("Invalid keyword. Use 'yearly' or 'annually' for annual rates.")
-        except (ValueError, IndexError):
-            print("Invalid input. Please enter a valid rate, optionally followed by 'yearly' or 'annually'.")
-
-
-def get_weights(tickers: list) -> np.ndarray:
+            ))
+        except ValueError as error:
+            print(error)
+
+
+def parse_target_rate(text: str) -> float:
+    """Parses a target rate like '0.1' (daily, in percent) or '4 annually' into a daily decimal.
+
+    Args:
+        text (str): The rate as a percentage, optionally followed by 'yearly' or 'annually'.
+
+    Raises:
+        ValueError: If the text isn't a number with an optional valid keyword.
+
+    Returns:
+        float: The daily rate as a decimal.
+    """
+    rate_input = str(text).split()
+    try:
+        rate = float(rate_input[0]) / 100  # percentage to decimal
+    except (ValueError, IndexError):
+        raise ValueError("Invalid input. Please enter a valid rate, optionally followed by 'yearly' or 'annually'.") from None
+
+    if len(rate_input) == 1:
+        return rate
+
+    if rate_input[1].lower() in ['yearly', 'annually']:
+        return (1 + rate) ** (1 / YEAR_DAYS) - 1  # annual to daily
+
+    raise ValueError("Invalid keyword. Use 'yearly' or 'annually' for annual rates.")
+
+
+def get_weights(tickers: list, individual_returns: pd.DataFrame = None) -> np.ndarray:
     """Prompts the user for which weights should be assigned.
 
     If custom weights are selected, the function ensures they sum to 1. If no custom weights 
-    are provided, the user can pick between equal or market cap weights.
+    are provided, the user can pick between equal, risk parity or market cap weights.
     
     Args:
         stock_symbols (list): List of stock tickers for which weights will be assigned.
+        individual_returns (pd.DataFrame, optional): Daily returns of the stocks, needed for
+            risk parity weights.
+
+    Raises:
+        ValueError: If risk parity is picked but no individual returns were passed.
 
     Returns:
         np.ndarray: Array of portfolio weights.
@@ -232,9 +416,16 @@ def get_weights(tickers: list) -> np.ndarray:
                 print("Total weight is larger than 1. Truncating weights.")
                 return weights / total_weight
     # equal or market cap weights
-    specification = input("Market capitalization weights or 'equalweights'? ")
+    specification = input("Market capitalization weights, 'equalweights' or 'riskparity'? ")
     if specification.strip().lower() == 'equalweights':
         weights = np.array([1 / len(tickers)] * len(tickers))
+    elif specification.strip().lower() == 'riskparity':
+        # rather than quietly falling back to market caps, which isn't what was asked for
+        if individual_returns is None:
+            raise ValueError("Risk parity weights need the individual returns of the stocks.")
+        # every stock contributes the same to the portfolio's volatility
+        import optimization as op # needs SciPy
+        weights = op.risk_parity(individual_returns.cov())
     else:
         weights = np.array(list(df.market_cap_weights(tickers).values()))
 
@@ -270,6 +461,24 @@ def get_dates(args) -> tuple[str, str]:
     return start_date, end_date
 
 
+def get_provider(args) -> providers.MarketDataProvider:
+    """Builds the market-data provider selected on the command line.
+
+    Args:
+        args: The parsed command-line arguments (argparse.Namespace).
+
+    Returns:
+        providers.MarketDataProvider: yFinance, a local data directory or synthetic data.
+    """
+    if args.provider == 'local':
+        if args.data_dir is None:
+            raise SystemExit("--provider local needs --data-dir.")
+        return providers.LocalProvider(args.data_dir)
+    if args.provider == 'synthetic':
+        return providers.SyntheticProvider(seed=args.seed)
+    return providers.YFinanceProvider()
+
+
 def is_valid_date(date_str: str) -> bool:
     """Checks if a given string is a valid date in YYYY-MM-DD format."""
     try:
@@ -283,9 +492,32 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Retrieve start/end dates for portfolio analysis.")
     parser.add_argument('--start', type=str, help='Start date in YYYY-MM-DD format')
     parser.add_argument('--end', type=str, help='End date in YYYY-MM-DD format')
+    parser.add_argument('--provider', choices=['yfinance', 'local', 'synthetic'], default='yfinance',
+                        help='Source of the market data (default: yfinance)')
+    parser.add_argument('--data-dir', type=str, help='Directory with <TICKER>.csv/.parquet files for --provider local')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for --provider synthetic')
+    parser.add_argument('--metrics-only', action='store_true',
+                        help='Print the metrics as JSON instead of prompting and showing the dashboard')
+    parser.add_argument('--weights', type=str, default='equal',
+                        help="For --metrics-only: 'equal', 'marketcap', 'riskparity' or one number per ticker")
+    parser.add_argument('--target-rate', type=str, default='0',
+                        help="For --metrics-only: target rate in percent, e.g. '0.01' or '4 annually'")
+    parser.add_argument('--simulation-seed', type=int, default=0, help='For --metrics-only: seed for the simulation')
     parser.add_argument('tickers', nargs='*', help="List of stock ticker symbols to analyze.")
         
     arguments = parser.parse_args()
+    df.set_provider(get_provider(arguments))
+    if arguments.metrics_only:
+        if not arguments.tickers or arguments.start is None or arguments.end is None:
+            parser.error("--metrics-only needs --start, --end and the tickers.")
+        try:
+            metrics = metrics_only(arguments.tickers, arguments.start, arguments.end, weights=arguments.weights,
+                                   target_rate=arguments.target_rate, seed=arguments.simulation_seed)
+        except ValueError as error:
+            parser.error(str(error))
+        # strict JSON: undefined metrics are already None
+        print(json.dumps(metrics, indent=2, allow_nan=False))
+        raise SystemExit
     START_DATE, END_DATE = get_dates(arguments)
     TICKERS = get_tickers(arguments)
     
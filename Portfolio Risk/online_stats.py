@@ -0,0 +1,160 @@
+"""Running mean and covariance of the individual returns, updated one day (or block) at a time.
+
+Instead of re-running the whole window through `process_data` every day and recomputing the
+means and the covariance from scratch in O(T * N^2), an `OnlineMoments` keeps Welford's running
+sums and folds in each new day of returns in O(N^2). Blocks of days are merged in one vectorized
+step (Chan et al.'s parallel update), which also seeds the state from a full history. With a
+`halflife`, older days fade out exponentially, matching `DataFrame.ewm(halflife=...)`.
+
+The state is a handful of arrays, saved to and loaded from a NumPy .npz file, so a daily job can
+load yesterday's state, add the new returns and save it again. The prices have to start at the
+close of the last day already added, since a return needs two closes; `update` then only adds
+the days after it (just one for a daily job, or every day a job missed):
+
+    moments = OnlineMoments.load('moments.npz')
+    new_returns = df.process_data(tickers, start_date=f"{moments.last_date:%Y-%m-%d}", end_date=tomorrow)
+    moments.update(new_returns)
+    moments.save('moments.npz')
+    rm.risk_contributions(None, weights, cov=moments.cov)
+
+Classes:
+- `OnlineMoments`: Persistent mean vector and covariance matrix with incremental updates.
+"""
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+
+class OnlineMoments:
+    """Mean vector and covariance matrix of daily returns, updated incrementally.
+
+    Every day gets a weight: 1 for equal weights, or a weight that decays by a factor
+    0.5 ** (1 / halflife) per newer day. The covariance uses the unbiased normalisation for such
+    weights, sum(w) - sum(w^2) / sum(w), which is the usual n - 1 for equal weights.
+
+    Parameters:
+        columns (list): Tickers, in the order of the columns of the returns.
+        halflife (float, optional): Halflife in days of the exponential weights; None weighs all
+            days the same.
+    """
+
+    def __init__(self, columns: list, halflife: float = None):
+        self.columns = pd.Index(columns)
+        self.halflife = halflife
+        self.decay = 1.0 if halflife is None else 0.5 ** (1 / halflife)
+
+        num_assets = len(self.columns)
+        self.count = 0
+        self.weight_sum = 0.0
+        self.weight_squares = 0.0
+        self._mean = np.zeros(num_assets)
+        self._m2 = np.zeros((num_assets, num_assets)) # weighted sum of outer products of deviations
+        self.last_date = None
+
+    @classmethod
+    def from_returns(cls, individual_returns: pd.DataFrame, halflife: float = None) -> "OnlineMoments":
+        """Starts the state from a history of returns, e.g. the output of `process_data`."""
+        moments = cls(individual_returns.columns, halflife=halflife)
+        moments.update(individual_returns)
+        return moments
+
+    def update(self, rows: Union[pd.DataFrame, pd.Series, np.ndarray]):
+        """Adds one or more new days of returns, oldest first.
+
+        For a DataFrame with a date index, days up to the last one already added are skipped,
+        so overlapping downloads can be passed as they are.
+
+        Parameters:
+            rows: One day of returns (1D) or several (days x tickers).
+
+        Raises:
+            ValueError: If the tickers don't match or the returns contain NaN values.
+        """
+        if isinstance(rows, (pd.DataFrame, pd.Series)):
+            if isinstance(rows, pd.Series):
+                rows = rows.to_frame().T
+            if not rows.columns.equals(self.columns):
+                raise ValueError("The columns of the returns don't match the tickers of the state.")
+            if self.last_date is not None and isinstance(rows.index, pd.DatetimeIndex):
+                rows = rows[rows.index > self.last_date]
+            if isinstance(rows.index, pd.DatetimeIndex) and len(rows):
+                self.last_date = rows.index[-1]
+        values = np.atleast_2d(np.asarray(rows, dtype=float))
+        if values.shape[1] != len(self.columns):
+            raise ValueError(f"Expected {len(self.columns)} returns per day, got {values.shape[1]}.")
+        if np.isnan(values).any():
+            raise ValueError("Returns contain NaN values.")
+        num_days = len(values)
+        if num_days == 0:
+            return
+
+        # the block's own moments, newest day weighing 1
+        weights = self.decay ** np.arange(num_days - 1, -1, -1)
+        block_weight = weights.sum()
+        block_mean = weights @ values / block_weight
+        deviations = values - block_mean
+        block_m2 = (deviations * weights[:, None]).T @ deviations
+
+        # the old days all get num_days days older
+        fade = self.decay ** num_days
+        old_weight = self.weight_sum * fade
+        self.weight_sum = old_weight + block_weight
+        self.weight_squares = self.weight_squares * fade ** 2 + weights @ weights
+        delta = block_mean - self._mean
+        self._mean = self._mean + delta * (block_weight / self.weight_sum)
+        self._m2 = self._m2 * fade + block_m2 + np.outer(delta, delta) * (old_weight * block_weight / self.weight_sum)
+        self.count += num_days
+
+    @property
+    def mean(self) -> pd.Series:
+        """Mean daily return per ticker."""
+        return pd.Series(self._mean, index=self.columns)
+
+    @property
+    def cov(self) -> pd.DataFrame:
+        """Covariance matrix of the daily returns (NaN before the second day)."""
+        normalisation = self.weight_sum - self.weight_squares / self.weight_sum if self.count else 0.0
+        values = self._m2 / normalisation if normalisation > 0 else np.full_like(self._m2, np.nan)
+        return pd.DataFrame(values, index=self.columns, columns=self.columns)
+
+    @property
+    def std(self) -> pd.Series:
+        """Standard deviation of the daily returns per ticker."""
+        return pd.Series(np.sqrt(np.diag(self.cov.values)), index=self.columns)
+
+    def portfolio_moments(self, weights: np.ndarray) -> tuple:
+        """Mean and standard deviation of the daily portfolio returns for fixed weights.
+
+        The tuple can be passed as `returns` to `future_simulation.simulate_future_returns`.
+        """
+        weights = np.asarray(weights, dtype=float)
+        return float(weights @ self._mean), float(np.sqrt(weights @ self.cov.values @ weights))
+
+    def sharpe_ratio(self, weights: np.ndarray, target_rate: float = 0.0) -> float:
+        """Sharpe Ratio of the portfolio, as `risk_metrics.sharpe_ratio` on its daily returns."""
+        mean, std = self.portfolio_moments(weights)
+        return (mean - target_rate) / std
+
+    def save(self, path: str):
+        """Writes the state to a NumPy .npz file."""
+        np.savez(path, columns=np.asarray(self.columns, dtype=str),
+                 halflife=np.nan if self.halflife is None else self.halflife,
+                 count=self.count, weight_sum=self.weight_sum, weight_squares=self.weight_squares,
+                 mean=self._mean, m2=self._m2,
+                 last_date='' if self.last_date is None else str(self.last_date))
+
+    @classmethod
+    def load(cls, path: str) -> "OnlineMoments":
+        """Reads a state written by `save`."""
+        with np.load(path, allow_pickle=False) as state:
+            halflife = float(state['halflife'])
+            moments = cls(state['columns'].tolist(), halflife=None if np.isnan(halflife) else halflife)
+            moments.count = int(state['count'])
+            moments.weight_sum = float(state['weight_sum'])
+            moments.weight_squares = float(state['weight_squares'])
+            moments._mean = state['mean']
+            moments._m2 = state['m2']
+            last_date = str(state['last_date'])
+            moments.last_date = pd.Timestamp(last_date) if last_date else None
+        return moments
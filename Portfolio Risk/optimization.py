@@ -0,0 +1,410 @@
+"""A set of helper functions to search for portfolio weights by mean-variance optimization.
+
+The mean returns and the covariance matrix are computed once from the individual returns of
+`process_data` (`moments`); everything else works on those, so e.g. a frontier over 2,000 assets
+never goes back to the DataFrame.
+
+`efficient_frontier` handles long-only and box constraints (lower <= weight <= upper, weights
+sum to 1) with Markowitz' critical line algorithm. It starts at the highest-return portfolio and
+lowers the risk appetite step by step, each time computing analytically where the next asset
+enters the portfolio or hits a bound (a turning point). Each turning point updates the inverse
+covariance of the assets that are not at a bound from the previous one by a rank-one change
+instead of factorising it again, so 2,000 assets take seconds. Between two turning points the optimal
+weights move linearly with the target return, so any number of target returns are exact
+interpolations. `closed_form_frontier` is the case without bounds (short positions allowed),
+which is just two linear solves.
+
+`risk_parity` finds the long-only weights whose risk contributions (the 'Total contribution' of
+`risk_metrics.risk_contributions`) are equal, or in given proportions (risk budgets). It minimises
+the convex function 1/2 x'Cx - sum(budget * log x) with Newton's method and normalises x to
+weights; a handful of iterations suffice, so hundreds of assets take milliseconds.
+
+Functions:
+- `moments`: Mean daily returns and covariance matrix of the individual returns.
+- `critical_line`: Turning points of the efficient frontier under box constraints.
+- `efficient_frontier`: Optimal weights, return and volatility for many target returns.
+- `closed_form_frontier`: The efficient frontier without bounds on the weights.
+- `risk_parity`: Equal-risk-contribution or risk-budgeted weights.
+"""
+from typing import Union
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import cho_factor, cho_solve
+from scipy.linalg.blas import dger
+
+Bound = Union[float, np.ndarray]
+SLOPE_TOLERANCE = 1e-10 # relative size below which a free weight's slope in lambda counts as zero
+REVERSAL_TOLERANCE = 1e-9 # relative distance in lambda within which an event counts as immediate
+
+
+def moments(individual_returns: pd.DataFrame) -> tuple:
+    """Mean daily returns and covariance matrix, to be computed once and shared.
+
+    Args:
+        individual_returns (pd.DataFrame): Daily returns per ticker, e.g. from `process_data`.
+
+    Returns:
+        tuple: The mean returns (pd.Series) and the covariance matrix (pd.DataFrame).
+    """
+    return individual_returns.mean(), individual_returns.cov()
+
+
+def _bounds(bound: Bound, num_assets: int) -> np.ndarray:
+    return np.broadcast_to(np.asarray(bound, dtype=float), (num_assets,)).copy()
+
+
+def _checked_budget(weights: np.ndarray) -> np.ndarray:
+    """A copy of the weights of a turning point, which must still add up to 1."""
+    if not np.isclose(weights.sum(), 1.0, rtol=0.0, atol=1e-8):
+        raise ValueError(f"Turning point weights add up to {weights.sum():.6g} instead of 1.")
+    return weights.copy()
+
+
+def _rounding_noise(values: np.ndarray, *terms) -> np.ndarray:
+    """Marks the values no larger than the rounding errors of the terms they were summed from."""
+    return np.abs(values) <= SLOPE_TOLERANCE * sum(np.abs(term) for term in terms)
+
+
+class _FreeSet:
+    """Assets permuted so the free ones come first, with the inverse covariance of the free block.
+
+    The covariance of the free assets and its rows for the fixed ones are then views of one
+    matrix, and an asset entering or leaving the free set is a swap of two rows and columns plus
+    a rank-one update of the inverse (O(N^2)) instead of a new factorisation (O(k^3)). The
+    covariance with the fixed weights, C @ w_fixed, changes by one column per event.
+    The inverse is stored column-major, so its first k columns are one contiguous block that
+    BLAS updates in place, without a k x k temporary.
+    """
+
+    def __init__(self, cov: np.ndarray, vectors: dict, free: np.ndarray):
+        self.order = np.argsort(~free, kind="stable") # free assets first
+        self.cov = cov[np.ix_(self.order, self.order)]
+        self.vectors = {name: vector[self.order] for name, vector in vectors.items()}
+        self.size = int(free.sum())
+        weights = self.vectors["weights"]
+        self.fixed_part = self.cov[:, self.size:] @ weights[self.size:]
+        self.inverse = np.zeros_like(self.cov, order="F")
+        self.inverse[:self.size, :self.size] = cho_solve(cho_factor(self.cov[:self.size, :self.size]),
+                                                         np.eye(self.size))
+
+    def _swap(self, i: int, j: int):
+        for array in (self.order, self.fixed_part, *self.vectors.values()):
+            array[[i, j]] = array[[j, i]]
+        for matrix in (self.cov, self.inverse):
+            matrix[[i, j]] = matrix[[j, i]]
+            matrix[:, [i, j]] = matrix[:, [j, i]]
+
+    def _rank_one(self, size: int, alpha: float, vector: np.ndarray):
+        """inverse[:size, :size] += alpha * vector vector' in place (rows beyond get zeros)."""
+        padded = np.zeros(len(self.inverse))
+        padded[:size] = vector
+        dger(alpha, padded, vector, a=self.inverse[:, :size], overwrite_a=True)
+
+    def add(self, position: int):
+        """Frees the fixed asset at `position` (>= size); it becomes the last free one."""
+        weights = self.vectors["weights"]
+        self.fixed_part -= self.cov[:, position] * weights[position]
+        self._swap(position, self.size)
+        k = self.size
+        column = self.cov[:k, k]
+        scaled = column @ self.inverse[:k, :k]
+        schur = self.cov[k, k] - column @ scaled # > 0 for a positive definite covariance
+        self._rank_one(k, 1 / schur, scaled)
+        self.inverse[:k, k] = self.inverse[k, :k] = -scaled / schur
+        self.inverse[k, k] = 1 / schur
+        self.size += 1
+
+    def remove(self, position: int, weight: float):
+        """Fixes the free asset at `position` (< size) at `weight`."""
+        last = self.size - 1
+        self._swap(position, last)
+        column = self.inverse[:last, last].copy()
+        self._rank_one(last, -1 / self.inverse[last, last], column)
+        self.inverse[last, :] = self.inverse[:, last] = 0.0
+        self.vectors["weights"][last] = weight
+        self.fixed_part += self.cov[:, last] * weight
+        self.size = last
+
+    def weights(self) -> np.ndarray:
+        """The weights in the original order of the assets."""
+        weights = np.empty_like(self.vectors["weights"])
+        weights[self.order] = self.vectors["weights"]
+        return weights
+
+
+def _reversal(assets: np.ndarray, kind: str, undo: tuple, candidates: np.ndarray, lambda_: float) -> np.ndarray:
+    """Marks the asset that changed at the last turning point if an event of `kind` undoes it at once.
+
+    Rounding can put the reverse event of the last one at the same lambda, which would make the
+    algorithm cycle or, with the event skipped, let the weight run past its bound. `undo` is the
+    kind of event that reverses the last one and the asset. An asset freed from one bound may
+    still reach the other one at once (tied mean returns).
+    """
+    if kind != undo[0]:
+        return np.zeros(len(assets), dtype=bool)
+    return (assets == undo[1]) & (candidates >= lambda_ * (1 - REVERSAL_TOLERANCE))
+
+
+def critical_line(mean: pd.Series, cov: pd.DataFrame, lower: Bound = 0.0, upper: Bound = 1.0) -> tuple:
+    """Turning points of the efficient frontier with lower <= weights <= upper and a budget of 1.
+
+    Solves min 1/2 w'Cw - lambda * mean'w for every lambda from infinity down to 0 at once:
+    between turning points the free weights are affine in lambda, w_F = a + lambda * c, so the
+    lambda at which a free weight reaches a bound, or a weight at a bound would rather move
+    away from it, can be computed directly. Each turning point updates the inverse covariance
+    of the free assets of the previous one (see `_FreeSet`), so it costs O(N^2), not O(N^3).
+
+    Args:
+        mean (pd.Series): Mean daily return per asset.
+        cov (pd.DataFrame): Covariance matrix of the daily returns.
+        lower (float or np.ndarray): Lower bound per asset (finite; default 0, i.e. long-only).
+        upper (float or np.ndarray): Upper bound per asset (default 1).
+
+    Raises:
+        ValueError: If no weights within the bounds add up to 1, or a turning point loses the
+            budget (numerical breakdown).
+
+    Returns:
+        tuple: The lambdas (decreasing, ending with 0) and the weights at each turning point
+            (shape: turning points x assets).
+    """
+    mean = np.asarray(mean, dtype=float)
+    cov = np.asarray(cov, dtype=float)
+    num_assets = len(mean)
+    lower, upper = _bounds(lower, num_assets), _bounds(upper, num_assets)
+    if not np.isfinite(lower).all() or lower.sum() > 1 or upper.sum() < 1 or (lower > upper).any():
+        raise ValueError("No weights within the bounds add up to 1.")
+
+    # highest return: fill up the best assets to their upper bound; the last one stays free
+    weights = lower.copy()
+    free = np.zeros(num_assets, dtype=bool)
+    budget = 1 - weights.sum()
+    for i in np.argsort(-mean, kind="stable"):
+        step = min(upper[i] - lower[i], budget)
+        weights[i] += step
+        budget -= step
+        if budget <= 1e-15:
+            free[i] = True
+            break
+
+    state = _FreeSet(cov, {"mean": mean, "lower": lower, "upper": upper, "weights": weights}, free)
+    mean, lower, upper, weights = (state.vectors[name] for name in ("mean", "lower", "upper", "weights"))
+    lambdas, turning_points = [], []
+    lambda_ = np.inf
+    undo = (None, None) # the event that would reverse the last one: its kind and the asset
+    while True:
+        k = state.size
+
+        # the free weights minimise the objective subject to the budget the fixed ones leave
+        # the inverse is symmetric, and rows times its columns run faster than the other way round
+        ones, scaled_mean, scaled_fixed = (np.vstack([np.ones(k), mean[:k], state.fixed_part[:k]])
+                                           @ state.inverse[:k, :k])
+        budget = 1 - weights[k:].sum()
+        gamma_0 = (budget + scaled_fixed.sum()) / ones.sum()
+        gamma_1 = -scaled_mean.sum() / ones.sum()
+        intercept = gamma_0 * ones - scaled_fixed
+        slope = scaled_mean + gamma_1 * ones
+        # rounding noise where the two terms cancel (always with one free asset) isn't a slope,
+        # and would put a spurious bound event at an absurdly large lambda
+        slope[_rounding_noise(slope, scaled_mean, gamma_1 * ones)] = 0.0
+
+        if lambda_ == np.inf and k > 1:
+            # assets whose mean return ties with the highest one can take any share of the budget
+            # without changing the return, so the first turning point has the least variance among
+            # them: move towards the optimum of the free ones and fix the first to reach a bound
+            step = intercept - weights[:k]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                limits = np.where(step < 0, (lower[:k] - weights[:k]) / step,
+                                  np.where(step > 0, (upper[:k] - weights[:k]) / step, np.inf))
+            j = np.argmin(limits)
+            if limits[j] < 1:
+                weights[:k] += limits[j] * step
+                state.remove(j, lower[j] if step[j] < 0 else upper[j])
+                undo = (None, None)
+                continue
+            weights[:k] = intercept
+
+        if lambda_ <= 0:
+            weights[:k] = intercept
+            lambdas.append(0.0)
+            turning_points.append(_checked_budget(state.weights()))
+            break
+
+        # next event below the current lambda: a free weight reaches a bound (never the last
+        # free one, which carries the budget) ...
+        next_lambda, event = 0.0, None
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for bound, kind, moving in ((lower, "lower", slope > 0), (upper, "upper", slope < 0)):
+                if k < 2:
+                    break
+                # as lambda decreases, a weight can only reach the bound it moves towards; one that
+                # is already there (e.g. several assets reaching a bound at once) reaches it right away
+                candidates = np.minimum((bound[:k] - intercept) / slope, lambda_)
+                valid = moving & (candidates > next_lambda) & ~_reversal(state.order[:k], kind, undo, candidates, lambda_)
+                if valid.any():
+                    j = np.argmax(np.where(valid, candidates, -np.inf))
+                    next_lambda, event = candidates[j], (kind, j)
+
+            # ... or the gradient of a fixed weight changes sign, so it wants to leave its bound
+            # (at the lower bound the gradient must stay >= 0, at the upper one <= 0)
+            if k < num_assets:
+                cross_0, cross_1 = (state.cov[k:, :k] @ np.column_stack([intercept, slope])).T
+                sign = np.where(weights[k:] > lower[k:], -1.0, 1.0)
+                gradient_0 = sign * (cross_0 + state.fixed_part[k:] - gamma_0)
+                gradient_1 = sign * (cross_1 - mean[k:] - gamma_1)
+                gradient_1[_rounding_noise(gradient_1, cross_1, mean[k:], gamma_1)] = 0.0
+                # sign * gradient turns negative below -gradient_0 / gradient_1, or right away for
+                # an asset whose mean return ties with the free ones (no slope) if it's negative already
+                tied = ((gradient_1 == 0) & (gradient_0 < 0)
+                        & ~_rounding_noise(gradient_0, cross_0, state.fixed_part[k:], gamma_0))
+                candidates = np.where(tied, lambda_, np.minimum(-gradient_0 / gradient_1, lambda_))
+                valid = (((gradient_1 > 0) | tied) & (lower[k:] < upper[k:]) & (candidates > next_lambda)
+                         & ~_reversal(state.order[k:], "free", undo, candidates, lambda_))
+                if valid.any():
+                    j = np.argmax(np.where(valid, candidates, -np.inf))
+                    next_lambda, event = candidates[j], ("free", k + j)
+
+        if event is None:
+            lambda_ = 0.0
+            continue
+
+        lambda_ = next_lambda
+        if lambda_ < np.inf: # tied assets join the free set before the first turning point
+            weights[:k] = intercept + lambda_ * slope
+            lambdas.append(lambda_)
+            turning_points.append(_checked_budget(state.weights()))
+
+        kind, position = event
+        if kind == "free":
+            undo = ("upper" if weights[position] > lower[position] else "lower", state.order[position])
+            state.add(position)
+        else:
+            undo = ("free", state.order[position])
+            state.remove(position, lower[position] if kind == "lower" else upper[position])
+
+    return np.array(lambdas), np.array(turning_points)
+
+
+def _frontier_frames(weights: np.ndarray, mean: pd.Series, cov: pd.DataFrame, target_rate: float) -> tuple:
+    """Return, volatility and Sharpe Ratio per set of weights, plus the weights as a DataFrame."""
+    portfolio_returns = weights @ np.asarray(mean, dtype=float)
+    volatility = np.sqrt(np.einsum("ij,jk,ik->i", weights, np.asarray(cov, dtype=float), weights))
+    frontier = pd.DataFrame({"return": portfolio_returns,
+                             "volatility": volatility,
+                             "sharpe_ratio": (portfolio_returns - target_rate) / volatility})
+    columns = mean.index if isinstance(mean, pd.Series) else None
+    return frontier, pd.DataFrame(weights, columns=columns)
+
+
+def efficient_frontier(mean: pd.Series, cov: pd.DataFrame, num_points: int = 100,
+                       target_returns: np.ndarray = None, lower: Bound = 0.0, upper: Bound = 1.0,
+                       target_rate: float = 0.0) -> tuple:
+    """Minimum-variance weights for many target returns under box constraints.
+
+    Args:
+        mean (pd.Series): Mean daily return per asset, e.g. from `moments`.
+        cov (pd.DataFrame): Covariance matrix of the daily returns, e.g. from `moments`.
+        num_points (int): Number of evenly spaced target returns, from the minimum-variance
+            portfolio to the highest attainable return (ignored if `target_returns` is given).
+        target_returns (np.ndarray, optional): Daily target returns; clipped to that range.
+        lower (float or np.ndarray): Lower bound per asset (finite; default 0, i.e. long-only).
+        upper (float or np.ndarray): Upper bound per asset (default 1).
+        target_rate (float): Daily target rate for the Sharpe Ratio (default is 0.0).
+
+    Returns:
+        tuple: A DataFrame with 'return', 'volatility' and 'sharpe_ratio' (daily) per point,
+            and a DataFrame with the weights per point, one column per asset.
+    """
+    _, turning_points = critical_line(mean, cov, lower=lower, upper=upper)
+    # from the minimum-variance portfolio upwards
+    turning_points = turning_points[::-1]
+    turning_returns = turning_points @ np.asarray(mean, dtype=float)
+    turning_returns = np.maximum.accumulate(turning_returns) # guards against rounding noise
+
+    if target_returns is None:
+        target_returns = np.linspace(turning_returns[0], turning_returns[-1], num_points)
+    target_returns = np.clip(np.asarray(target_returns, dtype=float), turning_returns[0], turning_returns[-1])
+
+    # the weights are linear in the target return between two turning points
+    upper_index = np.clip(np.searchsorted(turning_returns, target_returns), 1, len(turning_returns) - 1)
+    lower_index = upper_index - 1
+    span = turning_returns[upper_index] - turning_returns[lower_index]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.where(span > 0, (target_returns - turning_returns[lower_index]) / span, 0.0)
+    weights = (turning_points[lower_index] * (1 - fraction)[:, None]
+               + turning_points[upper_index] * fraction[:, None])
+    return _frontier_frames(weights, mean, cov, target_rate)
+
+
+def closed_form_frontier(mean: pd.Series, cov: pd.DataFrame, num_points: int = 100,
+                         target_returns: np.ndarray = None, target_rate: float = 0.0) -> tuple:
+    """Minimum-variance weights for many target returns when any weight, also negative, is allowed.
+
+    The weights are w = C^-1 [1, mean] M^-1 [1, target] with M = [1, mean]' C^-1 [1, mean],
+    so one Cholesky factorisation serves every target return.
+
+    Args:
+        mean (pd.Series): Mean daily return per asset, e.g. from `moments`.
+        cov (pd.DataFrame): Covariance matrix of the daily returns, e.g. from `moments`.
+        num_points (int): Number of evenly spaced target returns, from the minimum-variance
+            portfolio to the highest mean return of an asset (ignored if `target_returns` is given).
+        target_returns (np.ndarray, optional): Daily target returns.
+        target_rate (float): Daily target rate for the Sharpe Ratio (default is 0.0).
+
+    Returns:
+        tuple: A DataFrame with 'return', 'volatility' and 'sharpe_ratio' (daily) per point,
+            and a DataFrame with the weights per point, one column per asset.
+    """
+    mean_values = np.asarray(mean, dtype=float)
+    constraints = np.column_stack([np.ones(len(mean_values)), mean_values])
+    scaled = cho_solve(cho_factor(np.asarray(cov, dtype=float)), constraints)
+    system = constraints.T @ scaled
+
+    if target_returns is None:
+        minimum_variance_return = system[0, 1] / system[0, 0]
+        target_returns = np.linspace(minimum_variance_return, mean_values.max(), num_points)
+    targets = np.vstack([np.ones(len(target_returns)), np.asarray(target_returns, dtype=float)])
+    weights = (scaled @ np.linalg.solve(system, targets)).T
+    return _frontier_frames(weights, mean, cov, target_rate)
+
+
+def risk_parity(cov: pd.DataFrame, budgets: np.ndarray = None, tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+    """Long-only weights whose contributions to the portfolio risk are equal or as budgeted.
+
+    At the minimum of 1/2 x'Cx - sum(b * log x), x_i (Cx)_i = b_i for every asset, so the risk
+    contributions of w = x / sum(x) are proportional to the budgets b. Newton steps are damped
+    while far from the minimum (the function is self-concordant), which keeps x positive.
+
+    Args:
+        cov (pd.DataFrame): Covariance matrix of the daily returns, e.g. from `moments`.
+        budgets (np.ndarray, optional): Share of the risk per asset (positive; scaled to sum to 1).
+            Equal risk contributions by default.
+        tol (float): Tolerance on the Newton decrement.
+        max_iter (int): Maximum number of Newton steps.
+
+    Raises:
+        ValueError: If a budget isn't positive or the solver doesn't converge.
+
+    Returns:
+        np.ndarray: Portfolio weights summing to 1.
+    """
+    cov = np.asarray(cov, dtype=float)
+    num_assets = len(cov)
+    budgets = np.full(num_assets, 1 / num_assets) if budgets is None else np.asarray(budgets, dtype=float)
+    if budgets.shape != (num_assets,) or (budgets <= 0).any():
+        raise ValueError("Risk budgets must be positive, one per asset.")
+    budgets = budgets / budgets.sum()
+
+    # inverse-volatility weights are a good start (exact if the assets are uncorrelated)
+    x = budgets / np.sqrt(np.diag(cov))
+    x /= np.sqrt(x @ cov @ x)
+    for _ in range(max_iter):
+        gradient = cov @ x - budgets / x
+        hessian = cov + np.diag(budgets / x ** 2)
+        step = np.linalg.solve(hessian, gradient)
+        decrement = np.sqrt(gradient @ step)
+        if decrement < tol:
+            return x / x.sum()
+        x -= step / (1 + decrement) if decrement > 0.25 else step
+    raise ValueError("Risk parity did not converge.")
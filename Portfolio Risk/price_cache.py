@@ -0,0 +1,209 @@
+"""A set of helper functions to cache historical price data on disk.
+
+Each ticker is stored column-wise as two NumPy files, one with the trading dates and one with
+the adjusted closes, so they can be memory-mapped instead of read into memory in full.
+An `index.json` in the cache directory records which date range has already been fetched for
+each ticker (not just the dates that had trading). That lets a caller ask for the ranges
+that are still missing and only download those.
+
+Adjusted closes change whenever a split or dividend is paid, so closes fetched at different
+times can be on different bases. Every range that extends the cache therefore overlaps the
+cached one by `OVERLAP_DAYS`; on the days in both, the old closes are rescaled to the new basis,
+or, if the days don't agree on one factor, the ticker's old closes are dropped (and the caller
+has to fetch the rest of its range again).
+
+Functions:
+- `missing_ranges`: Returns the date ranges of a request that are not covered by the cache yet.
+- `load_prices`: Reads cached adjusted closes for a ticker and date range (memory-mapped).
+- `store_prices`: Merges newly fetched closes into the cache and extends the covered range.
+- `clear_cache`: Removes all cached data in a cache directory.
+
+All date ranges are half-open, [start, end), to mirror `yf.download`.
+"""
+
+import json
+import os
+import shutil
+from datetime import date, timedelta
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+INDEX_FILE = "index.json"
+OVERLAP_DAYS = 7 # calendar days an extension refetches of the cached range, i.e. a few trading days
+ADJUSTMENT_TOLERANCE = 1e-4 # relative spread of the old/new ratios on the overlap that is still one factor
+
+
+def _ticker_path(cache_dir: str, ticker: str, column: str) -> str:
+    """Path of one column file of a ticker; the symbol is quoted so e.g. '^GSPC' is a safe name."""
+    return os.path.join(cache_dir, f"{quote(ticker, safe='')}.{column}.npy")
+
+
+def read_index(cache_dir: str) -> dict:
+    """Reads the covered date range per ticker.
+
+    Args:
+        cache_dir (str): Directory of the cache.
+
+    Returns:
+        dict: Ticker -> [start, end] in 'YYYY-MM-DD' format; empty if nothing is cached yet.
+    """
+    try:
+        with open(os.path.join(cache_dir, INDEX_FILE), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_index(cache_dir: str, index: dict):
+    """Atomically replaces the index so a crash never leaves half a file behind."""
+    path = os.path.join(cache_dir, INDEX_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(index, file, indent=0, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _save_array(path: str, array: np.ndarray):
+    # np.save appends '.npy' to names that don't end in it, so the temp file keeps the suffix
+    tmp_path = path[:-len(".npy")] + ".tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def _shift(day: str, days: int) -> str:
+    return (date.fromisoformat(day) + timedelta(days=days)).isoformat()
+
+
+def missing_ranges(index: dict, ticker: str, start_date: str, end_date: str,
+                   overlap_days: int = OVERLAP_DAYS) -> list:
+    """Returns the parts of [start_date, end_date) that still have to be fetched for a ticker.
+
+    The covered range is kept contiguous, so a request that lies entirely before or after it
+    also fetches the gap in between. Each part reaches `overlap_days` into the covered range,
+    so `store_prices` can check that old and new closes are adjusted the same way.
+
+    Args:
+        index (dict): The covered ranges as returned by `read_index`.
+        ticker (str): The stock symbol.
+        start_date (str): Start of the request in 'YYYY-MM-DD' format.
+        end_date (str): End of the request (exclusive) in 'YYYY-MM-DD' format.
+        overlap_days (int): Calendar days to refetch of the covered range (default is OVERLAP_DAYS).
+
+    Returns:
+        list: List of (start, end) tuples; empty if everything is cached.
+    """
+    coverage = index.get(ticker)
+    if coverage is None:
+        return [(start_date, end_date)]
+
+    # ISO dates compare correctly as strings
+    covered_start, covered_end = coverage
+    ranges = []
+    if start_date < covered_start:
+        ranges.append((start_date, min(_shift(covered_start, overlap_days), covered_end)))
+    if end_date > covered_end:
+        ranges.append((max(_shift(covered_end, -overlap_days), covered_start), end_date))
+    return ranges
+
+
+def load_prices(cache_dir: str, ticker: str, start_date: str, end_date: str) -> pd.Series:
+    """Reads the cached adjusted closes of a ticker within [start_date, end_date).
+
+    Args:
+        cache_dir (str): Directory of the cache.
+        ticker (str): The stock symbol.
+        start_date (str): Start date in 'YYYY-MM-DD' format.
+        end_date (str): End date (exclusive) in 'YYYY-MM-DD' format.
+
+    Returns:
+        pd.Series: Adjusted closes indexed by date and named after the ticker;
+            empty if nothing is cached for that ticker.
+    """
+    try:
+        dates = np.load(_ticker_path(cache_dir, ticker, "dates"), mmap_mode="r")
+        closes = np.load(_ticker_path(cache_dir, ticker, "close"), mmap_mode="r")
+    except FileNotFoundError:
+        return pd.Series(dtype=float, index=pd.DatetimeIndex([], name="Date"), name=ticker)
+
+    # dates are sorted, so only the requested slice is read from disk
+    lower, upper = np.searchsorted(dates, [np.datetime64(start_date), np.datetime64(end_date)])
+    return pd.Series(np.asarray(closes[lower:upper]),
+                     index=pd.DatetimeIndex(np.asarray(dates[lower:upper]), name="Date"),
+                     name=ticker)
+
+
+def store_prices(cache_dir: str, prices: pd.DataFrame, start_date: str, end_date: str) -> list:
+    """Merges fetched adjusted closes into the cache and marks [start_date, end_date) as covered.
+
+    Rows from today onwards are not stored and not marked as covered because today's close
+    isn't final yet; those days are fetched again on the next call. Neither is the range of a
+    ticker that came back without any closes (e.g. a failed download), so it's fetched again.
+    Where the new closes overlap the cached ones, the cached closes are rescaled to the basis of
+    the new ones (a split or dividend since the last fetch); if the overlap doesn't agree on one
+    factor, the cached closes of that ticker are dropped and only the new range counts as covered.
+
+    Args:
+        cache_dir (str): Directory of the cache.
+        prices (pd.DataFrame): Adjusted closes indexed by date, one column per ticker
+            (NaN values are dropped).
+        start_date (str): Start of the fetched range in 'YYYY-MM-DD' format.
+        end_date (str): End of the fetched range (exclusive) in 'YYYY-MM-DD' format.
+
+    Returns:
+        list: The tickers whose cached closes were dropped, so only [start_date, end_date) is
+            cached for them now.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    today = date.today().isoformat()
+    end_date = min(end_date, today)
+    if start_date >= end_date:
+        return []
+
+    index = read_index(cache_dir)
+    dropped = []
+    for ticker in prices.columns:
+        column = prices[ticker].dropna()
+        if column.empty:
+            continue
+        new_dates = column.index.values.astype("datetime64[D]")
+        keep = new_dates < np.datetime64(today)
+        new_dates = new_dates[keep]
+        new_closes = column.values.astype(np.float64)[keep]
+
+        old = load_prices(cache_dir, ticker, "1900-01-01", "2200-01-01")
+        old_dates = old.index.values.astype("datetime64[D]")
+        old_closes = old.values
+        _, new_overlap, old_overlap = np.intersect1d(new_dates, old_dates, return_indices=True)
+        if len(new_overlap):
+            ratios = new_closes[new_overlap] / old_closes[old_overlap]
+            factor = np.median(ratios)
+            if np.all(np.abs(ratios / factor - 1) <= ADJUSTMENT_TOLERANCE):
+                old_closes = old_closes * factor
+            else:
+                old_dates, old_closes = old_dates[:0], old_closes[:0]
+                index.pop(ticker, None)
+                dropped.append(ticker)
+
+        # newly fetched values win over old ones for the same day
+        dates = np.concatenate([new_dates, old_dates])
+        closes = np.concatenate([new_closes, old_closes])
+        dates, first = np.unique(dates, return_index=True)
+
+        _save_array(_ticker_path(cache_dir, ticker, "dates"), dates)
+        _save_array(_ticker_path(cache_dir, ticker, "close"), closes[first])
+
+        covered_start, covered_end = index.get(ticker, (start_date, end_date))
+        index[ticker] = [min(start_date, covered_start), max(end_date, covered_end)]
+
+    _write_index(cache_dir, index)
+    return dropped
+
+
+def clear_cache(cache_dir: str):
+    """Removes all cached prices, e.g. to start over after the provider corrected its history.
+
+    Args:
+        cache_dir (str): Directory of the cache.
+    """
+    shutil.rmtree(cache_dir, ignore_errors=True)
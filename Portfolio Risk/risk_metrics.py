@@ -4,6 +4,17 @@ The functions assume input returns are formatted as Pandas Series, except for `r
 which requires a DataFrame of the individual returns. There are functions for Value at Risk (VaR),
 Conditional VaR (CVaR), the Sharpe and Sortino Ratio, drawdowns, and contributions to risk.
 
+Many portfolios can be evaluated in one NumPy pass: pass a 2D array or DataFrame of returns with
+one portfolio per column (e.g. `portfolio_returns` with a matrix of weights) and the metrics come
+back as an array (a Series indexed by the columns for a DataFrame) instead of a scalar.
+`risk_contributions` likewise accepts a weights matrix with one portfolio per column.
+
+VaR and CVaR accept `sample_weights`, one likelihood ratio per row, for returns that were drawn
+from a different distribution than the one they should describe (e.g. importance-sampled
+simulations, see `future_simulation`). The quantile is read off the weighted empirical distribution,
+where every row counts `weight / number of rows` (not `weight / sum of weights`, whose noise would
+swamp the tail).
+
 Functions:
 - `value_at_risk`: Calculates the Value at Risk (VaR) for a portfolio at a confidence level 
     using either the historical or parametric approach (assumes returns are Normal).
@@ -22,128 +33,266 @@ Functions:
     all time high right now in cumulative terms.
     
 - `risk_contributions`: Calculates marginal contribution to risk, total risk contribution, and
-    the normalized contribution for each asset.
+    the normalized contribution for each asset. Takes any covariance estimate from `covariance`.
+
+- `tail_risk_contributions`: Splits the portfolio's VaR and CVaR into one component per asset
+    (Euler allocation), from historical or simulated scenarios of the asset returns.
 """
+from statistics import NormalDist
+from typing import Union
+
 import numpy as np
 import pandas as pd
-from scipy.stats import norm
+
+Returns = Union[pd.Series, pd.DataFrame, np.ndarray]
+Metric = Union[float, pd.Series, np.ndarray]
+
+
+def _per_portfolio(values: np.ndarray, returns: Returns) -> Metric:
+    """Wraps a metric computed along axis 0 like its input: scalar, array or Series by column."""
+    if isinstance(returns, pd.DataFrame):
+        return pd.Series(values, index=returns.columns)
+    if np.ndim(values) == 0:
+        return float(values)
+    return values
 
 
-def value_at_risk(returns: pd.Series, confidence_level: float = 0.95, method: str = 'historical') -> float:
+def _weighted_quantile(values: np.ndarray, quantile: float, sample_weights: np.ndarray) -> np.ndarray:
+    """Smallest value whose weighted cumulative share reaches `quantile`, along axis 0.
+
+    The share is the sum of the weights up to a value over the number of values; with weights
+    that average 1 (likelihood ratios) that is an unbiased estimate of the distribution function.
+    """
+    order = np.argsort(values, axis=0)
+    sorted_values = np.take_along_axis(values, order, axis=0)
+    cumulative_weights = np.cumsum(np.take_along_axis(sample_weights, order, axis=0), axis=0)
+    position = np.sum(cumulative_weights < quantile * len(values), axis=0, keepdims=True)
+    return np.take_along_axis(sorted_values, np.minimum(position, len(values) - 1), axis=0)[0]
+
+
+def value_at_risk(returns: Returns, confidence_level: float = 0.95, method: str = 'historical',
+                  sample_weights: np.ndarray = None) -> Metric:
     """Calculates the Value at Risk (VaR) for a portfolio at a specified confidence level.
 
     Parameters:
-        returns (pd.Series): Daily portfolio returns.
+        returns (pd.Series, pd.DataFrame or np.ndarray): Daily portfolio returns;
+            if 2D, one portfolio per column.
         confidence_level (float): Confidence level for VaR (default is 95%).
         method (str): Method to calculate VaR ('historical' or 'parametric').
+        sample_weights (np.ndarray, optional): Likelihood ratio of every row of returns (they
+            average 1); None weighs all rows equally.
 
     Returns:
-        float: The Value at Risk (negative value indicating potential loss).
+        float: The Value at Risk (negative value indicating potential loss);
+            one per portfolio for 2D returns.
     """
-    if method == 'historical':
-        return np.percentile(returns, (1 - confidence_level) * 100)
-    if method == 'parametric':
-        mean = returns.mean()
-        std = returns.std()
-        z_score = norm.ppf(1 - confidence_level)
-        return mean - z_score * std
-    raise ValueError("Invalid method. Choose 'historical' or 'parametric'.")
-
-
-def conditional_value_at_risk(returns: pd.Series, confidence_level: float = 0.95) -> float:
+    if sample_weights is not None:
+        values = np.asarray(returns, dtype=float)
+        sample_weights = np.asarray(sample_weights, dtype=float).reshape((-1,) + (1,) * (values.ndim - 1))
+
+    if method == 'historical' and sample_weights is None:
+        var = np.percentile(returns, (1 - confidence_level) * 100, axis=0)
+    elif method == 'historical':
+        var = _weighted_quantile(values, 1 - confidence_level, np.broadcast_to(sample_weights, values.shape))
+    elif method == 'parametric':
+        if sample_weights is None:
+            mean = np.mean(returns, axis=0)
+            std = np.std(returns, axis=0, ddof=1)
+        else:
+            mean = np.average(values, axis=0, weights=np.broadcast_to(sample_weights, values.shape))
+            std = np.sqrt(np.sum(sample_weights * (values - mean) ** 2, axis=0) / np.sum(sample_weights))
+        # the z-score is negative, so this is below the mean
+        z_score = NormalDist().inv_cdf(1 - confidence_level)
+        var = mean + z_score * std
+    else:
+        raise ValueError("Invalid method. Choose 'historical' or 'parametric'.")
+    return _per_portfolio(np.asarray(var), returns)
+
+
+def conditional_value_at_risk(returns: Returns, confidence_level: float = 0.95,
+                              sample_weights: np.ndarray = None) -> Metric:
     """Calculates the CVaR/Expected Shortfall for a portfolio at a specified confidence level.
 
     Parameters:
-        returns (pd.Series): Daily portfolio returns.
+        returns (pd.Series, pd.DataFrame or np.ndarray): Daily portfolio returns;
+            if 2D, one portfolio per column.
         confidence_level (float): Confidence level for CVaR (default is 95%).
+        sample_weights (np.ndarray, optional): Likelihood ratio of every row of returns (they
+            average 1); None weighs all rows equally.
 
     Returns:
-        float: The Conditional Value at Risk.
+        float: The Conditional Value at Risk; one per portfolio for 2D returns.
     """
-    var = value_at_risk(returns, confidence_level, method='historical')
-    return returns[returns <= var].mean()
-
-
-def sharpe_ratio(returns: pd.Series, target_rate: float = 0.0) -> float:
+    var = np.asarray(value_at_risk(returns, confidence_level, method='historical',
+                                   sample_weights=sample_weights))
+    values = np.asarray(returns, dtype=float)
+    # var broadcasts over the rows, so every column is compared to its own VaR
+    tail = values <= var
+    if sample_weights is None:
+        cvar = np.sum(values, axis=0, where=tail) / np.sum(tail, axis=0)
+    else:
+        sample_weights = np.asarray(sample_weights, dtype=float).reshape((-1,) + (1,) * (values.ndim - 1))
+        tail_weights = np.where(tail, sample_weights, 0.0)
+        cvar = np.sum(tail_weights * values, axis=0) / np.sum(tail_weights, axis=0)
+    return _per_portfolio(cvar, returns)
+
+
+def sharpe_ratio(returns: Returns, target_rate: float = 0.0) -> Metric:
     """Calculates the Sharpe Ratio for a portfolio given daily returns.
 
     Parameters:
-        returns (pd.Series): Daily portfolio returns.
+        returns (pd.Series, pd.DataFrame or np.ndarray): Daily portfolio returns;
+            if 2D, one portfolio per column.
         target_rate (float): Daily target rate of return (default is 0.0).
 
     Returns:
-        float: The Sharpe Ratio.
+        float: The Sharpe Ratio; one per portfolio for 2D returns.
     """
-    excess_returns = returns - target_rate
-    return excess_returns.mean() / excess_returns.std()
+    excess_returns = np.asarray(returns, dtype=float) - target_rate
+    ratio = excess_returns.mean(axis=0) / excess_returns.std(axis=0, ddof=1)
+    return _per_portfolio(ratio, returns)
 
 
-def sortino_ratio(returns: pd.Series, target_rate: float = 0.0) -> float:
+def sortino_ratio(returns: Returns, target_rate: float = 0.0) -> Metric:
     """Calculates the Sortino Ratio for a portfolio given daily returns.
 
     Parameters:
-        returns (pd.Series): Daily portfolio returns.
+        returns (pd.Series, pd.DataFrame or np.ndarray): Daily portfolio returns;
+            if 2D, one portfolio per column.
         target_rate (float): Daily target rate of return (default is 0.0).
 
     Returns:
-        float: The Sortino Ratio.
+        float: The Sortino Ratio; one per portfolio for 2D returns.
     """
-    excess_returns = returns - target_rate
+    excess_returns = np.asarray(returns, dtype=float) - target_rate
 
     # np.minimum =/= np.min!
-    downside_risk = np.sqrt((np.minimum(excess_returns, 0) ** 2).mean())
-    return excess_returns.mean() / downside_risk
+    downside_risk = np.sqrt((np.minimum(excess_returns, 0) ** 2).mean(axis=0))
+    return _per_portfolio(excess_returns.mean(axis=0) / downside_risk, returns)
 
 
-def drawdowns(returns: pd.Series) -> pd.Series:
+def drawdowns(returns: Returns) -> Returns:
     """Calculates drawdowns for a portfolio given daily returns.
 
     Parameters:
-        returns (pd.Series): Daily portfolio returns.
+        returns (pd.Series, pd.DataFrame or np.ndarray): Daily portfolio returns;
+            if 2D, one portfolio per column.
 
     Returns:
-        pd.Series: The drawdown for each day in the portfolio.
+        pd.Series: The drawdown for each day in the portfolio
+            (same type and shape as `returns`).
     """
     # no - 1 at the end since we're normalizing to the peak.
     # E.g., $200 peak and $150 trough => -25%, not -50%
-    cumulative = (1 + returns).cumprod()
+    cumulative = np.cumprod(1 + np.asarray(returns, dtype=float), axis=0)
     
-    # cummax gives a Series the length of 'cumulative' with
+    # running maximum gives an array the length of 'cumulative' with
     # the max up to i in position i
     # the maximum drawdown is at: drawdowns(returns).min()
-    peak = cumulative.cummax()
-    return (cumulative - peak) / peak
-
-def risk_contributions(individual_returns: pd.DataFrame, weights: np.ndarray) -> pd.DataFrame:
+    peak = np.maximum.accumulate(cumulative, axis=0)
+    drawdown = (cumulative - peak) / peak
+    if isinstance(returns, pd.Series):
+        return pd.Series(drawdown, index=returns.index, name=returns.name)
+    if isinstance(returns, pd.DataFrame):
+        return pd.DataFrame(drawdown, index=returns.index, columns=returns.columns)
+    return drawdown
+
+def risk_contributions(individual_returns: pd.DataFrame, weights: np.ndarray, cov=None) -> pd.DataFrame:
     """Calculates Marginal Contribution to Risk (MCR), Total Risk Contribution (TRC),
     and Normalized Contribution for each asset in a portfolio.
 
     Args:
-        individual_returns (pd.DataFrame): Daily returns for a set of tickers.
-        weights (np.ndarray): Portfolio weights as a 1D array.
+        individual_returns (pd.DataFrame): Daily returns for a set of tickers; may be None if
+            `cov` is given.
+        weights (np.ndarray): Portfolio weights as a 1D array, or a (tickers x portfolios)
+            matrix to evaluate many portfolios with one covariance matrix.
+        cov (optional): Covariance matrix to use instead of the sample covariance, e.g. the
+            running one of an `online_stats.OnlineMoments`, or a `covariance.LowRankCovariance`
+            from `ledoit_wolf` or `pca_covariance`, which is applied through its factors
+            without forming the N x N matrix.
 
     Returns:
         pd.DataFrame: DataFrame with the following columns for each asset:
             - 'MCR': Marginal Contribution to Risk
             - 'TRC': Total Risk Contribution
             - 'Normalized Contribution': Contribution as a % (in decimal) of total portfolio risk.
+            For a weights matrix, the columns are (metric, portfolio) pairs, so e.g.
+            `results["Normalized contribution"]` has one column per portfolio.
     """
-    if not np.isclose(weights.sum(), 1):
+    weights = np.asarray(weights, dtype=float)
+    if not np.allclose(weights.sum(axis=0), 1):
         raise ValueError("Portfolio weights must sum to 1.")
 
-    cov_matrix = individual_returns.cov()
-    portfolio_variance = np.dot(weights.T, np.dot(cov_matrix, weights))
+    if cov is None:
+        cov = individual_returns.cov()
+    tickers = individual_returns.columns if individual_returns is not None else cov.index
+    if isinstance(cov, pd.DataFrame):
+        cov = cov.values
+    cov_weights = cov @ weights
+    # w^T C w for every portfolio (column) at once
+    portfolio_variance = np.sum(weights * cov_weights, axis=0)
     portfolio_risk = np.sqrt(portfolio_variance) # the SD of the portfolio returns
 
     # contributions to risk
-    mcr = np.dot(cov_matrix, weights) / portfolio_risk
+    mcr = cov_weights / portfolio_risk
     trc = mcr * weights
     normalized_contributions = trc / portfolio_risk
 
-    results = pd.DataFrame({
+    contributions = {
         "Marginal contribution": mcr,
         "Total contribution": trc,
         "Normalized contribution": normalized_contributions,
-    }, index=individual_returns.columns)
+    }
+    if weights.ndim == 1:
+        return pd.DataFrame(contributions, index=tickers)
+    return pd.concat({name: pd.DataFrame(values, index=tickers)
+                      for name, values in contributions.items()}, axis=1)
+
+
+def tail_risk_contributions(scenarios: Union[pd.DataFrame, np.ndarray], weights: np.ndarray,
+                            confidence_level: float = 0.95, window: float = 0.01) -> pd.DataFrame:
+    """Calculates the component VaR and CVaR of each asset (Euler allocation) from scenarios.
+
+    The component CVaR of an asset is its weight times its average return in the scenarios where
+    the portfolio is at or below its VaR, so the components add up to the portfolio's CVaR. The
+    component VaR uses the scenarios around the VaR instead: the `window` share of scenarios
+    whose portfolio return is closest to it, scaled so that the components add up to the VaR.
+    Both come from one pass over the scenarios, without sorting them.
 
-    return results
+    Args:
+        scenarios (pd.DataFrame or np.ndarray): Asset returns, one asset per column (e.g. the
+            individual returns); or simulated paths from `future_simulation.simulate_asset_returns`
+            (simulations x days x assets), whose days are pooled like the daily simulated C/VaR.
+        weights (np.ndarray): Portfolio weights as a 1D array.
+        confidence_level (float): Confidence level for VaR and CVaR (default is 95%).
+        window (float): Share of the scenarios around the VaR that estimate the component VaR
+            (default is 1%).
+
+    Returns:
+        pd.DataFrame: DataFrame with the following columns for each asset:
+            - 'Component VaR' and 'Component CVaR': They add up to the portfolio's VaR and CVaR.
+            - 'VaR share' and 'CVaR share': The same as a % (in decimal) of the total; negative
+              for assets that hedge the tail.
+    """
+    weights = np.asarray(weights, dtype=float)
+    tickers = scenarios.columns if isinstance(scenarios, pd.DataFrame) else None
+    values = np.asarray(scenarios, dtype=float)
+    values = values.reshape(-1, values.shape[-1])
+    portfolio = values @ weights
+
+    var = value_at_risk(portfolio, confidence_level)
+    tail = portfolio <= var
+    component_cvar = weights * values[tail].mean(axis=0)
+
+    # the scenarios closest to the VaR stand in for "the portfolio return equals the VaR"
+    num_nearest = min(max(int(window * len(portfolio)), 2), len(portfolio))
+    nearest = np.argpartition(np.abs(portfolio - var), num_nearest - 1)[:num_nearest]
+    component_var = weights * values[nearest].mean(axis=0)
+    component_var *= var / component_var.sum()
+
+    return pd.DataFrame({
+        "Component VaR": component_var,
+        "Component CVaR": component_cvar,
+        "VaR share": component_var / var,
+        "CVaR share": component_cvar / component_cvar.sum(),
+    }, index=tickers)
@@ -0,0 +1,296 @@
+"""Rolling-window and streaming versions of the risk metrics in `risk_metrics`.
+
+The functions compute a metric for every day over a trailing window of `window` days (or over
+all days so far if `window` is None, i.e. expanding) in one vectorized pass with Pandas.
+Returns can be a Series or a DataFrame with one portfolio per column.
+
+`RiskMonitor` is for live use: it is fed one daily return at a time and keeps running sums,
+so every new return updates Sharpe, Sortino, parametric VaR and drawdown in O(1) instead of
+recomputing over the whole history. Historical VaR/CVaR use a sorted list of the window's
+returns: an O(log n) search, but inserting and deleting shift the list, which is O(n) (a fast
+memmove, not a loop). The sum of the returns up to the VaR is kept as well, so CVaR needs no
+pass over the tail.
+
+Functions:
+- `rolling_sharpe_ratio`: Sharpe ratio over a trailing or expanding window.
+- `rolling_sortino_ratio`: Sortino ratio over a trailing or expanding window.
+- `rolling_value_at_risk`: Historical or parametric VaR over a trailing or expanding window.
+- `rolling_conditional_value_at_risk`: CVaR over a trailing or expanding window.
+- `rolling_drawdowns`: Drawdown from the highest value within a trailing or expanding window.
+
+Classes:
+- `RiskMonitor`: Streaming metrics with per-day updates.
+"""
+from bisect import bisect_left, bisect_right
+from collections import deque
+from statistics import NormalDist
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+Returns = Union[pd.Series, pd.DataFrame]
+
+
+def _window(returns: Returns, window: int = None, min_periods: int = None):
+    """Rolling window of `window` days, or an expanding window if it is None.
+
+    By default, values only start once the rolling window is full (two days if expanding).
+    """
+    if window is None:
+        return returns.expanding(min_periods=min_periods or 2)
+    return returns.rolling(window, min_periods=min_periods or window)
+
+
+def rolling_sharpe_ratio(returns: Returns, window: int = None, target_rate: float = 0.0) -> Returns:
+    """Calculates the Sharpe Ratio for every day over the trailing window.
+
+    Parameters:
+        returns (pd.Series or pd.DataFrame): Daily portfolio returns, one portfolio per column.
+        window (int): Number of days in the window; None for an expanding window.
+        target_rate (float): Daily target rate of return (default is 0.0).
+
+    Returns:
+        pd.Series or pd.DataFrame: The Sharpe Ratio per day (NaN until the window has filled).
+    """
+    excess_returns = _window(returns - target_rate, window)
+    return excess_returns.mean() / excess_returns.std()
+
+
+def rolling_sortino_ratio(returns: Returns, window: int = None, target_rate: float = 0.0) -> Returns:
+    """Calculates the Sortino Ratio for every day over the trailing window.
+
+    Parameters:
+        returns (pd.Series or pd.DataFrame): Daily portfolio returns, one portfolio per column.
+        window (int): Number of days in the window; None for an expanding window.
+        target_rate (float): Daily target rate of return (default is 0.0).
+
+    Returns:
+        pd.Series or pd.DataFrame: The Sortino Ratio per day (NaN until the window has filled).
+    """
+    excess_returns = returns - target_rate
+    downside_risk = np.sqrt(_window(np.minimum(excess_returns, 0) ** 2, window).mean())
+    return _window(excess_returns, window).mean() / downside_risk
+
+
+def rolling_value_at_risk(returns: Returns, window: int = None, confidence_level: float = 0.95,
+                          method: str = 'historical') -> Returns:
+    """Calculates the Value at Risk for every day over the trailing window.
+
+    The historical quantile is interpolated linearly like `np.percentile`; Pandas keeps the
+    window in a skiplist, so each day costs O(log window).
+
+    Parameters:
+        returns (pd.Series or pd.DataFrame): Daily portfolio returns, one portfolio per column.
+        window (int): Number of days in the window; None for an expanding window.
+        confidence_level (float): Confidence level for VaR (default is 95%).
+        method (str): Method to calculate VaR ('historical' or 'parametric').
+
+    Returns:
+        pd.Series or pd.DataFrame: The VaR per day (NaN until the window has filled).
+    """
+    if method == 'historical':
+        return _window(returns, window).quantile(1 - confidence_level)
+    if method == 'parametric':
+        rolling = _window(returns, window)
+        return rolling.mean() + NormalDist().inv_cdf(1 - confidence_level) * rolling.std()
+    raise ValueError("Invalid method. Choose 'historical' or 'parametric'.")
+
+
+def rolling_conditional_value_at_risk(returns: Returns, window: int = None,
+                                      confidence_level: float = 0.95) -> Returns:
+    """Calculates the CVaR/Expected Shortfall for every day over the trailing window.
+
+    Uses a `RiskMonitor` per portfolio, so it's a Python loop over the days, but each day only
+    touches the sorted window instead of sorting it again.
+
+    Parameters:
+        returns (pd.Series or pd.DataFrame): Daily portfolio returns, one portfolio per column.
+        window (int): Number of days in the window; None for an expanding window.
+        confidence_level (float): Confidence level for CVaR (default is 95%).
+
+    Returns:
+        pd.Series or pd.DataFrame: The CVaR per day (NaN until the window has filled).
+    """
+    if isinstance(returns, pd.DataFrame):
+        return returns.apply(rolling_conditional_value_at_risk, window=window,
+                             confidence_level=confidence_level)
+
+    min_periods = 2 if window is None else window
+    monitor = RiskMonitor(window=window, confidence_level=confidence_level)
+    cvar = np.full(len(returns), np.nan)
+    for i, value in enumerate(returns.values):
+        monitor.update(value)
+        if monitor.count >= min_periods:
+            cvar[i] = monitor.conditional_value_at_risk()
+    return pd.Series(cvar, index=returns.index, name=returns.name)
+
+
+def rolling_drawdowns(returns: Returns, window: int = None) -> Returns:
+    """Calculates the drawdown from the highest cumulative value within the trailing window.
+
+    With an expanding window this is the same as `risk_metrics.drawdowns`.
+
+    Parameters:
+        returns (pd.Series or pd.DataFrame): Daily portfolio returns, one portfolio per column.
+        window (int): Number of days in the window; None for an expanding window.
+
+    Returns:
+        pd.Series or pd.DataFrame: The drawdown for each day.
+    """
+    cumulative = (1 + returns).cumprod()
+    peak = _window(cumulative, window, min_periods=1).max()
+    return (cumulative - peak) / peak
+
+
+class RiskMonitor:
+    """Streaming risk metrics for a live feed of daily portfolio returns.
+
+    Every `update` adds one return and, once the window is full, drops the oldest one.
+    Mean and variance are kept with Welford's updates (also for removals), the downside risk as
+    a running sum, and the drawdown peak with a monotonic queue of log-wealth values, so all of
+    those cost O(1) per day. The returns of the window are also kept in a sorted list for the
+    historical VaR and CVaR; inserting and deleting shift up to `window` entries. For CVaR, the
+    sum of the smallest returns up to the lower order statistic of the VaR is kept too: an
+    insert or eviction below it swaps one return in or out, and the order statistic moves by
+    at most one per day.
+
+    Parameters:
+        window (int): Number of days in the window; None keeps all days (expanding).
+        confidence_level (float): Confidence level for VaR and CVaR (default is 95%).
+        target_rate (float): Daily target rate for Sharpe and Sortino (default is 0.0).
+
+    Example:
+        monitor = RiskMonitor(window=252)
+        for value in live_returns:
+            monitor.update(value)
+            print(monitor.sharpe_ratio(), monitor.value_at_risk())
+    """
+
+    def __init__(self, window: int = None, confidence_level: float = 0.95, target_rate: float = 0.0):
+        self.window = window
+        self.confidence_level = confidence_level
+        self.target_rate = target_rate
+        self.z_score = NormalDist().inv_cdf(1 - confidence_level)
+
+        self.values = deque()
+        self.sorted_values = []
+        self.tail_size = 0 # number of smallest returns in tail_sum
+        self.tail_sum = 0.0
+        self.count = 0
+        self.mean = 0.0
+        self.sum_squares = 0.0 # Welford's M2
+        self.downside_squares = 0.0
+
+        self.days = 0
+        self.log_wealth = 0.0
+        self.peaks = deque() # (day, log wealth), log wealth decreasing from left to right
+
+    def update(self, value: float):
+        """Adds the return of a new day.
+
+        Parameters:
+            value (float): The day's portfolio return.
+        """
+        value = float(value)
+        self.values.append(value)
+        position = bisect_right(self.sorted_values, value)
+        self.sorted_values.insert(position, value)
+        if position < self.tail_size:
+            # pushes the largest return of the tail out of it
+            self.tail_sum += value - self.sorted_values[self.tail_size]
+        self._add(value)
+
+        self.days += 1
+        self.log_wealth += np.log1p(value)
+        # older peaks that are lower than today can never be the maximum again
+        while self.peaks and self.peaks[-1][1] <= self.log_wealth:
+            self.peaks.pop()
+        self.peaks.append((self.days, self.log_wealth))
+
+        if self.window is not None and self.count > self.window:
+            old = self.values.popleft()
+            position = bisect_left(self.sorted_values, old)
+            del self.sorted_values[position]
+            if position < self.tail_size:
+                # the smallest return above the tail takes its place
+                self.tail_sum += self.sorted_values[self.tail_size - 1] - old
+            self._remove(old)
+            while self.peaks[0][0] <= self.days - self.window:
+                self.peaks.popleft()
+
+        self._move_tail()
+
+    def _move_tail(self):
+        """Moves the end of the summed tail to the lower order statistic of the historical VaR."""
+        size = int(np.floor((self.count - 1) * (1 - self.confidence_level))) + 1
+        while self.tail_size < size:
+            self.tail_sum += self.sorted_values[self.tail_size]
+            self.tail_size += 1
+        while self.tail_size > size:
+            self.tail_size -= 1
+            self.tail_sum -= self.sorted_values[self.tail_size]
+
+    def _add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.sum_squares += delta * (value - self.mean)
+        self.downside_squares += min(value - self.target_rate, 0) ** 2
+
+    def _remove(self, value: float):
+        self.count -= 1
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.sum_squares = max(self.sum_squares - delta * (value - self.mean), 0.0)
+        self.downside_squares = max(self.downside_squares - min(value - self.target_rate, 0) ** 2, 0.0)
+
+    def std(self) -> float:
+        """Sample standard deviation of the returns in the window."""
+        return np.sqrt(self.sum_squares / (self.count - 1)) if self.count > 1 else np.nan
+
+    def sharpe_ratio(self) -> float:
+        """Sharpe Ratio over the window, as `risk_metrics.sharpe_ratio`."""
+        return (self.mean - self.target_rate) / self.std()
+
+    def sortino_ratio(self) -> float:
+        """Sortino Ratio over the window, as `risk_metrics.sortino_ratio`."""
+        downside_risk = np.sqrt(self.downside_squares / self.count)
+        return (self.mean - self.target_rate) / downside_risk
+
+    def value_at_risk(self, method: str = 'historical') -> float:
+        """Value at Risk over the window, as `risk_metrics.value_at_risk`.
+
+        Parameters:
+            method (str): Method to calculate VaR ('historical' or 'parametric').
+
+        Returns:
+            float: The Value at Risk (negative value indicating potential loss).
+        """
+        if method == 'historical':
+            # linear interpolation between the two closest order statistics, written like
+            # np.percentile's so it never falls below the lower one (e.g. tied returns)
+            position = (self.count - 1) * (1 - self.confidence_level)
+            lower = int(np.floor(position))
+            lower_value, upper_value = self.sorted_values[lower], self.sorted_values[min(lower + 1, self.count - 1)]
+            fraction = position - lower
+            if fraction < 0.5:
+                return lower_value + (upper_value - lower_value) * fraction
+            return upper_value - (upper_value - lower_value) * (1 - fraction)
+        if method == 'parametric':
+            return self.mean + self.z_score * self.std()
+        raise ValueError("Invalid method. Choose 'historical' or 'parametric'.")
+
+    def conditional_value_at_risk(self) -> float:
+        """CVaR/Expected Shortfall over the window, as `risk_metrics.conditional_value_at_risk`.
+
+        The mean of the returns up to the VaR, from the running tail sum in O(log n).
+        """
+        var = self.value_at_risk('historical')
+        size = bisect_right(self.sorted_values, var)
+        # returns tied with the upper order statistic of the VaR can be <= VaR too
+        return (self.tail_sum + (size - self.tail_size) * self.sorted_values[size - 1]) / size
+
+    def drawdown(self) -> float:
+        """Today's drawdown from the highest cumulative value within the window."""
+        return np.expm1(self.log_wealth - self.peaks[0][1])
@@ -0,0 +1,137 @@
+"""Replays historical stress windows against current portfolio weights.
+
+A stress scenario is a named date window, e.g. the 2008 financial crisis or the March 2020 crash.
+`ScenarioLibrary` slices every window out of the individual returns (e.g. a long history from
+`process_data`, served from the price cache) once, together with up to `recovery_days` trading
+days after it, and stacks them into one zero-padded days x scenarios x tickers array. Stress
+testing any number of portfolios is then one matrix product with the weights and one call of
+`risk_metrics.drawdowns` along the days, for all scenarios and portfolios at once; the library
+can be reused for every new set of weights.
+
+Per scenario and portfolio it reports the return over the window, the peak-to-trough loss within
+it, the trough date and the time to recovery: the trading days from the trough until the
+portfolio is back at its pre-trough peak (NaN if that doesn't happen within the data).
+
+Classes:
+- `ScenarioLibrary`: Precomputed returns of the stress windows, with `stress_test` for weights.
+"""
+import warnings
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+import risk_metrics as rm
+
+SCENARIOS = { # name -> (first day, last day) of the window
+    'Dot-com crash': ('2000-03-24', '2002-10-09'),
+    '2008 financial crisis': ('2008-09-01', '2009-03-09'),
+    '2011 euro debt crisis': ('2011-07-22', '2011-10-03'),
+    '2015-16 China selloff': ('2015-08-10', '2016-02-11'),
+    'Q4 2018 selloff': ('2018-10-01', '2018-12-24'),
+    'March 2020 crash': ('2020-02-19', '2020-03-23'),
+    '2022 rate shock': ('2022-01-03', '2022-10-12'),
+}
+RECOVERY_DAYS = 756 # trading days after a window (3 years) in which to look for the recovery
+
+
+class ScenarioLibrary:
+    """Returns of the stress windows, sliced once and stacked for vectorized replays.
+
+    Windows that aren't fully covered by the returns are left out with a warning.
+
+    Parameters:
+        individual_returns (pd.DataFrame): Daily returns per ticker indexed by date, covering the
+            scenarios, e.g. from `process_data`.
+        scenarios (dict): Name -> (first day, last day) of each window (default is SCENARIOS).
+        recovery_days (int): Trading days after each window in which to look for the recovery
+            (default is RECOVERY_DAYS).
+
+    Raises:
+        ValueError: If none of the windows is covered by the returns.
+
+    Example:
+        library = ScenarioLibrary(df.process_data(tickers, '1999-01-01', '2024-12-31'))
+        results = library.stress_test(weights_matrix) # tickers x portfolios
+        worst = results['max_drawdown'].groupby(level='scenario').min()
+    """
+
+    def __init__(self, individual_returns: pd.DataFrame, scenarios: dict = None,
+                 recovery_days: int = RECOVERY_DAYS):
+        scenarios = SCENARIOS if scenarios is None else scenarios
+        dates = individual_returns.index
+        self.tickers = individual_returns.columns
+
+        slices = {}
+        for name, (start, end) in scenarios.items():
+            start, end = pd.Timestamp(start), pd.Timestamp(end)
+            if start < dates[0] or end > dates[-1]:
+                warnings.warn(f"Scenario '{name}' ({start:%Y-%m-%d} to {end:%Y-%m-%d}) is outside the returns.")
+                continue
+            first = dates.searchsorted(start)
+            last = dates.searchsorted(end, side='right')
+            slices[name] = (first, last, min(last + recovery_days, len(dates)))
+        if not slices:
+            raise ValueError("None of the scenarios is covered by the returns.")
+
+        self.names = list(slices)
+        self.window_days = np.array([last - first for first, last, _ in slices.values()])
+        self.available_days = np.array([stop - first for first, _, stop in slices.values()])
+        self.dates = [dates[first:stop] for first, _, stop in slices.values()]
+
+        # zero returns after the end of the data keep both the value and the drawdown flat
+        values = individual_returns.values
+        self.returns = np.zeros((self.available_days.max(), len(self.names), len(self.tickers)))
+        for i, (first, _, stop) in enumerate(slices.values()):
+            self.returns[:stop - first, i] = values[first:stop]
+
+    def stress_test(self, weights: Union[np.ndarray, pd.DataFrame]) -> pd.DataFrame:
+        """Replays every scenario for every portfolio, with buy-at-start fixed weights.
+
+        Args:
+            weights (np.ndarray or pd.DataFrame): Portfolio weights as a 1D array, or a
+                (tickers x portfolios) matrix; DataFrame columns name the portfolios.
+
+        Raises:
+            ValueError: If the weights don't match the tickers of the library.
+
+        Returns:
+            pd.DataFrame: One row per (scenario, portfolio) with 'return' (over the window),
+                'max_drawdown' (peak-to-trough within the window), 'trough' (date),
+                'days_to_trough' and 'recovery_days' (from the trough back to the peak).
+        """
+        weight_values = np.asarray(weights, dtype=float)
+        matrix = weight_values.reshape(len(weight_values), -1)
+        if len(matrix) != len(self.tickers):
+            raise ValueError(f"Expected {len(self.tickers)} weights per portfolio, got {len(matrix)}.")
+        portfolios = weights.columns if isinstance(weights, pd.DataFrame) else pd.RangeIndex(matrix.shape[1])
+
+        # days x scenarios x portfolios
+        returns = self.returns @ matrix
+        days = np.arange(len(returns))[:, None, None]
+        in_window = days < self.window_days[None, :, None]
+
+        window_returns = np.where(in_window, returns, 0.0)
+        total_return = np.prod(1 + window_returns, axis=0) - 1
+        # a day without returns in front, so a loss on the first day counts from the start value
+        drawdown = rm.drawdowns(np.concatenate([np.zeros_like(returns[:1]), returns]))[1:]
+        window_drawdown = np.where(in_window, drawdown, 0.0)
+        trough = np.argmin(window_drawdown, axis=0)
+        max_drawdown = np.min(window_drawdown, axis=0)
+
+        # first day after the trough (within the data) on which the drawdown is back to zero
+        recovered = ((drawdown >= 0) & (days > trough[None])
+                     & (days < self.available_days[None, :, None]))
+        recovery_day = np.argmax(recovered, axis=0)
+        recovery_days = np.where(recovered.any(axis=0), recovery_day - trough, np.nan)
+        recovery_days = np.where(max_drawdown < 0, recovery_days, 0.0)
+
+        index = pd.MultiIndex.from_product([self.names, portfolios], names=['scenario', 'portfolio'])
+        trough_dates = np.array([self.dates[i][trough[i]] for i in range(len(self.names))])
+        return pd.DataFrame({
+            'return': total_return.ravel(),
+            'max_drawdown': max_drawdown.ravel(),
+            'trough': trough_dates.ravel(),
+            'days_to_trough': trough.ravel(),
+            'recovery_days': recovery_days.ravel(),
+        }, index=index)
@@ -0,0 +1,69 @@
+"""Checks that one unusable portfolio gets an error row instead of failing the whole batch,
+that `run_batch` returns its timing instead of printing it, and that a dashboard reuses the
+simulation of the metrics.
+
+Run with `python -m pytest test_batch.py`.
+"""
+import numpy as np
+import pytest
+
+import batch
+import datafetch as df
+import future_simulation as fs
+import providers
+
+
+class _FlatProvider(providers.SyntheticProvider):
+    """Synthetic prices, except that 'FLAT' never moves, so risk parity can't weight it."""
+
+    def prices(self, tickers: list, start_date: str, end_date: str):
+        prices = super().prices(tickers, start_date, end_date)
+        if 'FLAT' in prices:
+            prices['FLAT'] = 100.0
+        return prices
+
+
+@pytest.fixture
+def flat_provider():
+    previous = df.get_provider()
+    df.set_provider(_FlatProvider())
+    yield
+    df.set_provider(previous)
+
+
+def _portfolio(name: str, tickers: list, weights) -> dict:
+    return {'name': name, 'tickers': tickers, 'weights': weights,
+            'start': '2021-01-01', 'end': '2022-01-01', 'target_rate': 0.0}
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_failing_weights_give_an_error_row(flat_provider):
+    portfolios = [_portfolio('first', ['A', 'B'], 'equal'),
+                  _portfolio('flat', ['A', 'FLAT'], 'riskparity'),
+                  _portfolio('last', ['A', 'B'], np.array([0.4, 0.6]))]
+
+    metrics = batch.run_batch(portfolios, workers=1)
+
+    assert list(metrics.index) == ['first', 'flat', 'last']
+    assert metrics.loc['flat', 'error'] == "Risk parity did not converge."
+    assert metrics.loc[['first', 'last'], 'error'].isna().all()
+    assert metrics.loc[['first', 'last'], 'sharpe_ratio'].notna().all()
+
+
+def test_timing_is_returned_not_printed(flat_provider, capsys):
+    metrics = batch.run_batch([_portfolio('first', ['A', 'B'], 'equal')], workers=1)
+
+    assert metrics.attrs['seconds'] >= metrics.attrs['data_seconds'] > 0
+    assert capsys.readouterr().out == ''
+
+
+def test_dashboard_reuses_the_simulation(flat_provider, tmp_path, monkeypatch):
+    simulations = []
+    simulate = fs.simulate
+    monkeypatch.setattr(fs, 'simulate', lambda *args, **kwargs: simulations.append(kwargs) or simulate(*args, **kwargs))
+
+    metrics = batch.run_batch([_portfolio('first', ['A', 'B'], 'equal')], workers=1, dashboard_dir=str(tmp_path))
+
+    assert len(simulations) == 1
+    assert metrics.loc['first', 'dashboard'] == str(tmp_path / 'first.png')
+    assert (tmp_path / 'first.png').exists()
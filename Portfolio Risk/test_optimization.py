@@ -0,0 +1,96 @@
+"""Regression checks of the critical line algorithm against a direct QP solve, and of its cost.
+
+Run with `python -m pytest test_optimization.py`.
+"""
+import time
+import timeit
+import warnings
+
+import numpy as np
+from scipy.linalg import cho_factor
+from scipy.optimize import minimize
+
+import optimization as op
+
+
+def _minimum_variance(mean: np.ndarray, cov: np.ndarray, target_return: float, upper: float) -> float:
+    """Lowest variance for the target return with 0 <= weights <= upper, from SLSQP."""
+    num_assets = len(mean)
+    fit = minimize(lambda x: x @ cov @ x, np.full(num_assets, 1 / num_assets), jac=lambda x: 2 * cov @ x,
+                   method="SLSQP", bounds=[(0, upper)] * num_assets,
+                   constraints=[{"type": "eq", "fun": lambda x: x.sum() - 1},
+                                {"type": "eq", "fun": lambda x: x @ mean - target_return}],
+                   options={"ftol": 1e-15, "maxiter": 500})
+    return fit.fun
+
+
+def _optimality_violation(mean: np.ndarray, cov: np.ndarray, lambda_: float, weights: np.ndarray,
+                          upper: float) -> float:
+    """Largest violation of the optimality conditions at a turning point, relative to the gradient.
+
+    The gradient C w - lambda * mean must be the same for the free assets, no lower for those at
+    0 and no higher for those at the upper bound (nothing to check if no asset is free).
+    """
+    gradient = cov @ weights - lambda_ * mean
+    at_lower, at_upper = weights <= 1e-12, weights >= upper - 1e-12
+    if (at_lower | at_upper).all():
+        return 0.0
+    level = np.median(gradient[~at_lower & ~at_upper])
+    violation = np.concatenate([np.abs(gradient[~at_lower & ~at_upper] - level),
+                                level - gradient[at_lower], gradient[at_upper] - level])
+    return violation.max() / np.abs(gradient).max()
+
+
+def test_capped_frontier_matches_qp():
+    # 30 assets capped at 30% each: the highest-return end has a single free asset, whose
+    # slope in lambda is pure rounding noise and used to end the free set
+    for seed in range(5):
+        rng = np.random.default_rng(seed)
+        returns = (rng.normal(size=(500, 3)) @ rng.normal(size=(3, 30)) * 0.01
+                   + rng.normal(size=(500, 30)) * 0.01 + rng.normal(0.0005, 0.0005, 30))
+        mean, cov = returns.mean(axis=0), np.cov(returns.T)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            _, turning_points = op.critical_line(mean, cov, lower=0.0, upper=0.3)
+            frontier, weights = op.efficient_frontier(mean, cov, num_points=10, upper=0.3)
+
+        np.testing.assert_allclose(turning_points.sum(axis=1), 1.0, atol=1e-10)
+        assert (weights.values <= 0.3 + 1e-12).all() and (weights.values >= -1e-12).all()
+        for target_return, volatility in zip(frontier["return"], frontier["volatility"]):
+            assert volatility ** 2 <= _minimum_variance(mean, cov, target_return, 0.3) * (1 + 1e-8)
+
+
+def test_tied_mean_returns():
+    # mean returns rounded to 0.01%, so assets tie; those tied with the highest free one can take
+    # any share of the budget at the highest return, and used to be left at a bound or run past it
+    for seed in range(10):
+        rng = np.random.default_rng(seed)
+        returns = (rng.normal(size=(500, 3)) @ rng.normal(size=(3, 20)) * 0.01
+                   + rng.normal(size=(500, 20)) * 0.01 + rng.normal(0.0005, 0.0005, 20))
+        mean, cov = np.round(returns.mean(axis=0), 4), np.cov(returns.T)
+
+        lambdas, turning_points = op.critical_line(mean, cov, lower=0.0, upper=0.15)
+        assert (turning_points <= 0.15 + 1e-12).all() and (turning_points >= -1e-12).all()
+        for lambda_, weights in zip(lambdas, turning_points):
+            assert _optimality_violation(mean, cov, lambda_, weights, 0.15) < 1e-8
+
+
+def test_turning_points_are_cheaper_than_factorisations():
+    # 1,000 assets that enter the portfolio one by one: refactorising the covariance of the free
+    # assets at every turning point, as this used to, costs more than a quarter of a full
+    # factorisation per turning point; the rank-one updates cost a small fraction of one
+    rng = np.random.default_rng(2)
+    loadings = rng.normal(0.5, 0.1, (1000, 3)) * 0.001
+    cov = loadings @ loadings.T + np.diag(rng.uniform(1e-4, 2e-4, 1000))
+    mean = rng.normal(0.0004, 0.0002, 1000)
+    factorisation = min(timeit.repeat(lambda: cho_factor(cov), number=1, repeat=5))
+
+    start = time.perf_counter()
+    lambdas, turning_points = op.critical_line(mean, cov)
+    elapsed = time.perf_counter() - start
+
+    assert len(lambdas) > 900
+    assert elapsed < 0.25 * len(lambdas) * factorisation
+    for lambda_, weights in zip(lambdas[::50], turning_points[::50]):
+        assert _optimality_violation(mean, cov, lambda_, weights, 1.0) < 1e-8
@@ -0,0 +1,73 @@
+"""Checks of the price cache when closes fetched at different times are adjusted differently.
+
+Run with `python -m pytest test_price_cache.py`.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import datafetch as df
+import price_cache as pc
+import providers
+
+
+class _AdjustingProvider(providers.SyntheticProvider):
+    """Synthetic prices, cacheable, whose closes before `ex_date` are scaled by `factor`.
+
+    That is how a dividend or split since the last download shows in adjusted closes. Downloads
+    that start on one of `failing_starts` come back empty, as without a connection.
+    """
+    name = "adjusting"
+    cacheable = True
+
+    def __init__(self):
+        super().__init__(seed=1)
+        self.ex_date, self.factor, self.failing_starts = None, 1.0, set()
+        self.requests = []
+
+    def prices(self, tickers: list, start_date: str, end_date: str) -> pd.DataFrame:
+        self.requests.append((tuple(tickers), start_date, end_date))
+        prices = super().prices(tickers, start_date, end_date)
+        if start_date in self.failing_starts:
+            return prices.iloc[:0]
+        if self.ex_date is not None:
+            prices[prices.index < self.ex_date] *= self.factor
+        return prices
+
+
+def test_adjustment_since_the_last_download_rescales_the_cache(tmp_path):
+    provider = _AdjustingProvider()
+    df.fetch_prices(["A", "B"], "2020-01-01", "2020-05-01", cache_dir=str(tmp_path), provider=provider)
+
+    # a dividend since the last download scales all closes before it, so every overlap day agrees
+    provider.ex_date, provider.factor = "2020-06-15", 0.98
+    prices = df.fetch_prices(["A", "B"], "2020-01-01", "2020-09-01", cache_dir=str(tmp_path), provider=provider)
+
+    assert provider.requests[-1] == (("A", "B"), "2020-04-24", "2020-09-01")
+    expected = provider.prices(["A", "B"], "2020-01-01", "2020-09-01")
+    np.testing.assert_allclose(prices.values, expected.values, rtol=1e-12)
+
+
+def test_adjustment_within_the_overlap_fetches_the_whole_range_again(tmp_path):
+    provider = _AdjustingProvider()
+    df.fetch_prices(["A", "B"], "2020-01-01", "2020-05-01", cache_dir=str(tmp_path), provider=provider)
+
+    # ex-date inside the overlap: the old closes can't be put on the new basis by one factor, and
+    # used to be dropped, leaving only the extension, so the prices started in late April
+    provider.ex_date, provider.factor = "2020-04-28", 0.9
+    prices = df.fetch_prices(["A", "B"], "2020-01-01", "2020-09-01", cache_dir=str(tmp_path), provider=provider)
+
+    assert provider.requests[-1] == (("A", "B"), "2020-01-01", "2020-09-01")
+    expected = provider.prices(["A", "B"], "2020-01-01", "2020-09-01")
+    assert prices.index[0] == pd.Timestamp("2020-01-01")
+    np.testing.assert_allclose(prices.values, expected.values, rtol=1e-12)
+    assert pc.read_index(str(tmp_path / provider.name))["A"] == ["2020-01-01", "2020-09-01"]
+
+
+def test_failed_download_after_dropping_the_cache_raises(tmp_path):
+    provider = _AdjustingProvider()
+    df.fetch_prices(["A"], "2020-01-01", "2020-05-01", cache_dir=str(tmp_path), provider=provider)
+    provider.ex_date, provider.factor = "2020-04-28", 0.9
+    provider.failing_starts = {"2020-01-01"}
+    with pytest.raises(ValueError, match="could not be downloaded again"):
+        df.fetch_prices(["A"], "2020-01-01", "2020-09-01", cache_dir=str(tmp_path), provider=provider)
@@ -0,0 +1,25 @@
+"""Checks the streaming CVaR of `RiskMonitor` against `risk_metrics` on the same windows.
+
+Run with `python -m pytest test_rolling_metrics.py`.
+"""
+import numpy as np
+import pandas as pd
+
+import risk_metrics as rm
+import rolling_metrics as rl
+
+
+def test_streaming_cvar_matches_the_window():
+    # rounded returns and days without trading tie around the VaR; with 20 days at 90% the VaR
+    # falls between two equal returns, and used to round below them and leave them out of the tail
+    rng = np.random.default_rng(0)
+    returns = np.round(rng.normal(0, 0.01, 300), 3)
+    returns[rng.random(300) < 0.3] = 0.0
+    for window, confidence_level in ((5, 0.95), (20, 0.9), (60, 0.5), (None, 0.99)):
+        cvar = rl.rolling_conditional_value_at_risk(pd.Series(returns), window=window,
+                                                    confidence_level=confidence_level)
+        first = 1 if window is None else window - 1
+        expected = [rm.conditional_value_at_risk(returns[max(i + 1 - (window or i + 1), 0):i + 1], confidence_level)
+                    for i in range(first, len(returns))]
+        assert cvar[:first].isna().all()
+        np.testing.assert_allclose(cvar[first:], expected, rtol=0, atol=1e-15)
@@ -0,0 +1,40 @@
+"""Checks the stress-test metrics, in particular the time to recovery, on returns made up by hand.
+
+Run with `python -m pytest test_stress.py`.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import stress
+
+# window: up 10%, down 10% twice (trough 0.891 from a peak of 1.1), up 5%; then 5% and 20% more,
+# which is the first day back above the peak, 3 trading days after the trough
+RISKY = [0.0, 0.0, 0.1, -0.1, -0.1, 0.05, 0.05, 0.2, 0.0, 0.0]
+
+
+def _library(recovery_days: int) -> stress.ScenarioLibrary:
+    dates = pd.bdate_range('2020-01-06', periods=len(RISKY))
+    returns = pd.DataFrame({'RISKY': RISKY, 'CASH': 0.0}, index=dates)
+    return stress.ScenarioLibrary(returns, scenarios={'crash': ('2020-01-08', '2020-01-13')},
+                                  recovery_days=recovery_days)
+
+
+def test_recovery_days_count_from_the_trough():
+    weights = pd.DataFrame({'risky': [1.0, 0.0], 'cash': [0.0, 1.0]}, index=['RISKY', 'CASH'])
+    results = _library(recovery_days=5).stress_test(weights).loc['crash']
+
+    assert results.loc['risky', 'return'] == pytest.approx(1.1 * 0.9 * 0.9 * 1.05 - 1)
+    assert results.loc['risky', 'max_drawdown'] == pytest.approx(0.891 / 1.1 - 1)
+    assert results.loc['risky', 'trough'] == pd.Timestamp('2020-01-10')
+    assert results.loc['risky', 'days_to_trough'] == 2
+    assert results.loc['risky', 'recovery_days'] == 3
+    # no loss, nothing to recover from
+    assert results.loc['cash', 'max_drawdown'] == 0
+    assert results.loc['cash', 'recovery_days'] == 0
+
+
+def test_no_recovery_within_the_horizon_is_nan():
+    # the data after the window ends before the 20% day
+    results = _library(recovery_days=1).stress_test(np.array([1.0, 0.0]))
+    assert np.isnan(results.loc[('crash', 0), 'recovery_days'])
@@ -0,0 +1,202 @@
+"""A set of helper functions to look up ticker metadata (market cap, country, ...) in batches.
+
+`yf.Ticker(ticker).info` is one blocking round trip per ticker. The functions here run those
+lookups on a bounded thread pool instead, with a rate limit per host, retries with backoff for
+transient failures (network errors, timeouts, throttling), and a time-to-live cache so repeated
+lookups within a session are free. Any other error means the ticker isn't there, which is
+answered at once with an empty dictionary instead of being retried.
+
+The actual lookup is a plain function `ticker -> dict` (by default `YFinanceProvider.info` from
+`providers`), so it can be swapped out; `offline_info` builds such a stand-in that answers
+locally after an artificial delay, which is handy to benchmark the batching without network access.
+
+Functions:
+- `offline_info`: Builds a local stand-in lookup with synthetic market caps and a fixed delay.
+- `fetch_info`: Looks up the info for many tickers concurrently.
+- `market_caps`: Returns the market caps for many tickers at once.
+- `clear_info_cache`: Empties the cache of info dictionaries.
+"""
+
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import providers
+
+MAX_WORKERS = 8 # concurrent lookups
+REQUESTS_PER_SECOND = 10 # per host
+RETRIES = 3 # attempts after the first failed one
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504) # HTTP statuses of a failure that may go away
+TRANSIENT_NAMES = ("RateLimit", "Timeout", "Connection") # in the class names of retryable errors
+BACKOFF = 0.5 # seconds before the first retry, doubled for every further retry
+TTL = 6 * 60 * 60 # seconds an info dictionary stays cached
+
+
+class RateLimiter:
+    """Spaces out requests to one host so they start at most `rate` times per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Blocks until the next request may be sent."""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        time.sleep(max(slot - now, 0))
+
+
+class TTLCache:
+    """Thread-safe dictionary whose entries expire `ttl` seconds after they were stored."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value or None if it is missing or expired."""
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def set(self, key, value):
+        """Stores a value with the current time."""
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+
+    def clear(self):
+        """Removes all entries."""
+        with self.lock:
+            self.entries.clear()
+
+
+_YFINANCE = providers.YFinanceProvider()
+_CACHE = TTLCache(TTL)
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def _limiter(host: str, rate: float) -> RateLimiter:
+    """One shared limiter per host, so separate batches don't add up to a higher rate."""
+    with _LIMITERS_LOCK:
+        if host not in _LIMITERS:
+            _LIMITERS[host] = RateLimiter(rate)
+        _LIMITERS[host].interval = 1 / rate
+        return _LIMITERS[host]
+
+
+def offline_info(latency: float = 0.05, seed: int = 0) -> Callable[[str], dict]:
+    """Builds a local stand-in for the yFinance lookup to benchmark batched lookups offline.
+
+    Every ticker gets a reproducible market cap between 1 and 1,000 billion and a country,
+    after sleeping for `latency` seconds to imitate the round trip.
+
+    Args:
+        latency (float): Seconds every lookup takes (default is 0.05).
+        seed (int): Changes the synthetic market caps (default is 0).
+
+    Returns:
+        Callable[[str], dict]: Lookup function with the same signature as `MarketDataProvider.info`.
+    """
+    def info(ticker: str) -> dict:
+        time.sleep(latency)
+        # crc32 instead of hash() so the numbers don't change between runs
+        fraction = zlib.crc32(f"{seed}:{ticker}".encode()) / 2**32
+        return {"symbol": ticker, "country": "Offline", "marketCap": int(10 ** (9 + 3 * fraction))}
+    return info
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a failed lookup may succeed when retried: network trouble, timeouts or throttling."""
+    if any(name in cls.__name__ for cls in type(error).__mro__ for name in TRANSIENT_NAMES):
+        return True
+    if isinstance(error, OSError): # also the HTTP errors of requests and curl_cffi
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+        return status is None or status in RETRY_STATUSES
+    return False
+
+
+def _lookup(ticker: str, fetcher: Callable[[str], dict], limiter: RateLimiter,
+            retries: int, backoff: float) -> dict:
+    """Single lookup with cache, rate limit and retries; returns {} for an unknown ticker or
+    if all attempts fail."""
+    cached = _CACHE.get((fetcher, ticker))
+    if cached is not None:
+        return cached
+
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            info = fetcher(ticker) or {}
+        # yFinance raises all sorts of things for unknown tickers or throttled requests
+        except Exception as error: # pylint: disable=broad-except
+            if not _is_transient(error):
+                # a definitive miss, e.g. a 404 or a parsing error for an unknown symbol
+                _CACHE.set((fetcher, ticker), {})
+                return {}
+            if attempt < retries:
+                time.sleep(backoff * 2 ** attempt)
+            continue
+        _CACHE.set((fetcher, ticker), info)
+        return info
+    return {}
+
+
+def fetch_info(tickers: list, fetcher: Callable[[str], dict] = None, host: str = "yahoo",
+               max_workers: int = MAX_WORKERS, rate: float = REQUESTS_PER_SECOND,
+               retries: int = RETRIES, backoff: float = BACKOFF) -> dict:
+    """Looks up the info dictionaries of many tickers concurrently.
+
+    Args:
+        tickers (list): A list of stock ticker symbols (e.g., ['AAPL', 'MSFT']).
+        fetcher (Callable[[str], dict], optional): The lookup for one ticker;
+            defaults to `YFinanceProvider().info`.
+        host (str): Name of the host behind `fetcher`; all lookups to one host share a rate limit.
+        max_workers (int): Maximum number of lookups in flight.
+        rate (float): Maximum number of requests per second to the host.
+        retries (int): How often a lookup that failed transiently (network, timeout,
+            throttling) is retried.
+        backoff (float): Seconds before the first retry, doubled for every further one.
+
+    Returns:
+        dict: Ticker -> info dictionary, in the order of `tickers`;
+            empty dictionaries for tickers whose lookup failed.
+    """
+    if fetcher is None:
+        fetcher = _YFINANCE.info
+    limiter = _limiter(host, rate)
+
+    unique = list(dict.fromkeys(tickers))
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique)))) as pool:
+        infos = pool.map(lambda t: _lookup(t, fetcher, limiter, retries, backoff), unique)
+        return dict(zip(unique, infos))
+
+
+def market_caps(tickers: list, fetcher: Callable[[str], dict] = None, **kwargs) -> dict:
+    """Returns the market caps of many tickers at once.
+
+    Args:
+        tickers (list): A list of stock ticker symbols (e.g., ['AAPL', 'MSFT']).
+        fetcher (Callable[[str], dict], optional): The lookup for one ticker;
+            defaults to `YFinanceProvider().info`.
+        **kwargs: Passed on to `fetch_info`.
+
+    Returns:
+        dict: Ticker -> market cap; 0 where it is unknown.
+    """
+    infos = fetch_info(tickers, fetcher=fetcher, **kwargs)
+    return {ticker: info.get('marketCap') or 0 for ticker, info in infos.items()}
+
+
+def clear_info_cache():
+    """Empties the cache of info dictionaries, e.g. to force fresh market caps."""
+    _CACHE.clear()
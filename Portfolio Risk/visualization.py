@@ -6,9 +6,15 @@ accompanied by Value at Risk (VaR) and Conditional Value at Risk (CVaR).
 They require an Axes object and each function returns the object with the plot, allowing for
 further customization if desired.
 
+Line plots of long series are downsampled before plotting: the series is cut into `max_points / 2`
+buckets and only the lowest and highest value of each are drawn. At screen resolution that looks
+the same as plotting every point (spikes and crashes are kept), but the time to draw no longer
+grows with the length of the history.
+
 Functions:
 - `ax_setup`: Utility to return a new Matplotlib Axes object in the first place.
 - `set_plot_labels`: Utility to set labels and title of an Axes object.
+- `downsample`: Reduces a long series to the lowest and highest value per bucket.
 - `plot_historical_returns`: Plot daily portfolio returns over time.
 - `plot_cumulative_returns`: Plot cumulative portfolio returns over time.
 - `plot_drawdowns`: Plot portfolio drawdowns over time.
@@ -16,14 +22,28 @@ Functions:
 - `pie_risk_contributions`: Plot pie chart of the normalized contributions to portfolio risk.
 - `plot_simulations`: Plot a subset of simulated returns with VaR and CVaR.
 - `plot_simulations_cumulative`: Plot cumulative simulated returns with CIs and CVaR.
+- `plot_drawdown_distribution`: Plot a histogram of a drawdown figure across simulated paths.
+- `render_panel`: Draws one plot function on its own off-screen figure and returns the pixels.
+- `save_panels`: Renders plots in parallel processes and writes them as one image file.
 """
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Union
+
+import matplotlib.image as mpimg
 import matplotlib.pyplot as plt
 from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
 import numpy as np
 import pandas as pd
 
 import risk_metrics as rm
 import datafetch as df
+import future_simulation as fs
+
+MAX_POINTS = 2000 # points per line at most, about the pixel width of a dashboard panel
 
 
 def ax_setup() -> Axes:
@@ -51,12 +71,49 @@ def set_plot_labels(title: str, xlabel: str, ylabel: str, axes: Axes):
     axes.grid(alpha=0.4)
 
 
-def plot_historical_returns(returns: pd.Series, axes: Axes = None) -> Axes:
+def _extreme_positions(values: np.ndarray, max_points: int) -> np.ndarray:
+    """Sorted positions of the lowest and highest value in each of max_points / 2 buckets."""
+    num_values = len(values)
+    bucket_size = -(-num_values // (max_points // 2)) # ceil
+    num_buckets = -(-num_values // bucket_size)
+    padded = np.full(num_buckets * bucket_size, np.nan)
+    padded[:num_values] = values
+    buckets = padded.reshape(num_buckets, bucket_size)
+
+    # NaNs (and the padding) never win, unless a bucket has nothing else
+    offsets = bucket_size * np.arange(num_buckets)
+    lowest = np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1) + offsets
+    highest = np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1) + offsets
+    positions = np.unique(np.concatenate([lowest, highest]))
+    return positions[positions < num_values]
+
+
+def downsample(values: Union[pd.Series, np.ndarray], max_points: int = MAX_POINTS) -> Union[pd.Series, np.ndarray]:
+    """Reduces a long series to the lowest and highest value per bucket, in their original order.
+
+    Args:
+        values (pd.Series or np.ndarray): The series to plot (1D).
+        max_points (int): Number of points to keep at most; None keeps all of them.
+
+    Returns:
+        pd.Series or np.ndarray: The kept values (with their index for a Series); the input
+            itself if it is short enough.
+    """
+    if max_points is None or len(values) <= max_points:
+        return values
+    positions = _extreme_positions(np.asarray(values, dtype=float), max_points)
+    if isinstance(values, pd.Series):
+        return values.iloc[positions]
+    return values[positions]
+
+
+def plot_historical_returns(returns: pd.Series, axes: Axes = None, max_points: int = MAX_POINTS) -> Axes:
     """Plot daily portfolio returns over time for historical data.
 
     Args:
         returns (pd.Series): Historical daily portfolio returns.
         ax (matplotlib.axes.Axes): Axis to plot on. If None, creates a new figure and axis.
+        max_points (int): Downsample to at most this many points; None plots all of them.
 
     Returns:
         Axes: The matplotlib Axes object with the plot.
@@ -64,7 +121,7 @@ def plot_historical_returns(returns: pd.Series, axes: Axes = None) -> Axes:
     if axes is None:
         axes = ax_setup()
 
-    axes.plot(returns, label="Daily Returns", color="blue", alpha=0.8)
+    axes.plot(downsample(returns, max_points), label="Daily Returns", color="blue", alpha=0.8)
     axes.axhline(0, color='black', linewidth=0.8, linestyle='--', alpha=0.7)
     set_plot_labels("Historical daily portfolio returns",
                     "Date",
@@ -72,12 +129,13 @@ def plot_historical_returns(returns: pd.Series, axes: Axes = None) -> Axes:
     return axes
 
 
-def plot_cumulative_returns(returns: pd.Series, axes: Axes = None) -> Axes:
+def plot_cumulative_returns(returns: pd.Series, axes: Axes = None, max_points: int = MAX_POINTS) -> Axes:
     """Plot cumulative portfolio returns over time for historical data.
 
     Args:
         returns (pd.Series): Historical daily portfolio returns.
         ax (matplotlib.axes.Axes): Axis to plot on. If None, creates a new figure and axis.
+        max_points (int): Downsample to at most this many points; None plots all of them.
 
     Returns:
         Axes: The matplotlib Axes object with the plot.
@@ -85,7 +143,7 @@ def plot_cumulative_returns(returns: pd.Series, axes: Axes = None) -> Axes:
     if axes is None:
         axes = ax_setup()
 
-    cumulative_values = df.cumulative_returns(returns)
+    cumulative_values = downsample(df.cumulative_returns(returns), max_points)
     axes.plot(cumulative_values, label="Cumulative Returns", color="green", alpha=0.8)
     set_plot_labels("Historical cumulative portfolio returns",
                     "Date",
@@ -93,12 +151,13 @@ def plot_cumulative_returns(returns: pd.Series, axes: Axes = None) -> Axes:
     return axes
 
 
-def plot_drawdowns(returns: pd.Series, axes: Axes = None) -> Axes:
+def plot_drawdowns(returns: pd.Series, axes: Axes = None, max_points: int = MAX_POINTS) -> Axes:
     """Plot portfolio drawdowns over time for historical data.
 
     Args:
         returns (pd.Series): Historical daily portfolio returns.
         ax (matplotlib.axes.Axes): Axis to plot on. If None, creates a new figure and axis.
+        max_points (int): Downsample to at most this many points; None plots all of them.
 
     Returns:
         Axes: The matplotlib Axes object with the plot.
@@ -106,7 +165,7 @@ def plot_drawdowns(returns: pd.Series, axes: Axes = None) -> Axes:
     if axes is None:
         axes = ax_setup()
 
-    drawdown_values = rm.drawdowns(returns)
+    drawdown_values = downsample(rm.drawdowns(returns), max_points)
     axes.plot(drawdown_values, label="Drawdowns", color="red", alpha=0.8)
     axes.fill_between(drawdown_values.index, drawdown_values, 0, color='red', alpha=0.2)
     set_plot_labels("Portfolio Drawdowns", "Date", "Drawdown", axes)
@@ -137,12 +196,20 @@ def plot_var_cvar(returns: pd.Series, var: float, cvar: float, axes: Axes = None
     return axes
 
 
-def pie_risk_contributions(normalized_contributions: pd. Series, axes: Axes = None) -> Axes:
+def pie_risk_contributions(normalized_contributions: pd. Series, axes: Axes = None,
+                           title: str = "Risk contribution by asset") -> Axes:
     """Plot pie chart of the normalized contributions to portfolio risk of the individual assets.
 
+    Works for the volatility contributions of `risk_contributions` ('Normalized contribution')
+    as well as the tail contributions of `tail_risk_contributions` ('VaR share'/'CVaR share').
+    Assets with a negative share (hedges) can't be a slice, so they are listed in a legend with
+    their share instead. The slices are labeled with the original shares, which then add up to
+    more than 100%.
+
     Args:
         normalized_contributions (pd.Series): Norm. contr. to total portfolio risk for each asset.
         axes (Axes, optional): Axis to plot on. If None, creates a new figure and axis.
+        title (str): Title of the chart, e.g. naming the risk measure.
 
     Returns:
         Axes: The matplotlib Axes object with the plot.
@@ -151,29 +218,37 @@ def pie_risk_contributions(normalized_contributions: pd. Series, axes: Axes = No
     if axes is None:
         axes = plt.subplots(figsize=(8, 8))[1]
     
+    positive = normalized_contributions[normalized_contributions > 0]
+    hedges = normalized_contributions[normalized_contributions < 0]
     axes.pie(
-        normalized_contributions,
-        labels=normalized_contributions.index,
-        autopct='%1.1f%%',
+        positive,
+        labels=positive.index,
+        # the pie fills the circle with the positive shares, the labels keep the original ones
+        autopct=lambda percent: f"{percent * positive.sum():.1f}%",
         startangle=90,
         counterclock=False,
         # color-blind palette:
         colors=['#377eb8', '#4daf4a', '#984ea3', '#ff7f00', '#ffff33', '#a65628', '#f781bf', '#999999']
         )
-    axes.set_title("Risk contribution by asset")
+    if len(hedges):
+        handles = [Patch(facecolor="none", edgecolor="grey", hatch="//", label=f"{asset}: {share:.1%}")
+                   for asset, share in hedges.items()]
+        axes.legend(handles=handles, title="Hedges (negative share)", loc="lower right", fontsize="small")
+    axes.set_title(title)
     return axes
 
 
-def plot_simulations(simulated_returns: np.ndarray, var: float, cvar: float, num_paths=3,
-                     axes: Axes = None) -> Axes:
+def plot_simulations(simulated_returns: Union[np.ndarray, fs.SimulationResult], var: float, cvar: float,
+                     num_paths=3, axes: Axes = None, max_points: int = MAX_POINTS) -> Axes:
     """Plot a random subset of simulated daily returns to visualize variability, and the C/VaR.
 
     Args:
-        simulated_returns (np.ndarray): Simulated daily returns (2D).
+        simulated_returns (np.ndarray or SimulationResult): Simulated daily returns (2D).
         num_paths (int): Number of random simulation paths to plot.
         var (float): Monte Carlo derived Value at Risk.
         cvar (float): Monte Carlo derived Conditional Value at Risk.
         ax (matplotlib.axes.Axes): Axis to plot on. If None, creates a new figure and axis.
+        max_points (int): Downsample each path to at most this many points; None plots all of them.
 
     Returns:
         Axes: The matplotlib Axes object with the plot.
@@ -181,11 +256,15 @@ def plot_simulations(simulated_returns: np.ndarray, var: float, cvar: float, num
     if axes is None:
         axes = ax_setup()
 
+    if isinstance(simulated_returns, fs.SimulationResult):
+        simulated_returns = simulated_returns.daily
     sampled_paths = simulated_returns[np.random.choice(simulated_returns.shape[0],
                                                        num_paths,
                                                        replace=False), :]
+    days = np.arange(simulated_returns.shape[1])
     for path in sampled_paths:
-        axes.plot(path, alpha=0.8)
+        positions = _extreme_positions(path, max_points) if max_points and len(path) > max_points else days
+        axes.plot(days[positions], path[positions], alpha=0.8)
 
     axes.axhline(var, color="orange", linestyle="--", linewidth=1, label=f"VaR ({var:.2%})")
     axes.axhline(cvar, color="red", linestyle="--", linewidth=1, label=f"CVaR ({cvar:.2%})")
@@ -195,16 +274,19 @@ def plot_simulations(simulated_returns: np.ndarray, var: float, cvar: float, num
     return axes
 
 
-def plot_simulations_cumulative(simulated_returns: np.ndarray, cvar: float, lower_pct: int = 5,
-                                upper_pct: int = 95, axes: Axes = None) -> Axes:
+def plot_simulations_cumulative(simulated_returns: Union[np.ndarray, fs.SimulationResult], cvar: float,
+                                lower_pct: int = 5, upper_pct: int = 95, axes: Axes = None,
+                                max_points: int = MAX_POINTS) -> Axes:
     """Plot CIs for cumulative returns over the simulation period and the CVaR for those returns.
 
     Args:
-        cumulative_returns (np.ndarray): Simulated cumulative returns (2D).
+        simulated_returns (np.ndarray or SimulationResult): Simulated daily returns (2D); a
+            SimulationResult reuses its cached cumulative paths and percentile bands.
         cvar (float): Monte Carlo Conditional Value at Risk.
         ax (matplotlib.axes.Axes): Axis to plot on. If None, creates a new figure and axis.
         lower_pct (int): Lower bound for the CI.
         upper_pct (int): Upper bound for the CI.
+        max_points (int): Downsample the bands to at most this many days; None plots all of them.
 
     Returns:
         Axes: The matplotlib Axes object with the plot.
@@ -212,10 +294,14 @@ def plot_simulations_cumulative(simulated_returns: np.ndarray, cvar: float, lowe
     if axes is None:
         axes = ax_setup()
 
-    cum_returns = df.cumulative_returns(simulated_returns)
-    days = np.arange(cum_returns.shape[1])
-    percentiles = [lower_pct, 50, upper_pct]
-    stats = np.percentile(cum_returns, percentiles, axis=0)
+    if not isinstance(simulated_returns, fs.SimulationResult):
+        simulated_returns = fs.SimulationResult(simulated_returns)
+    days = np.arange(simulated_returns.num_days)
+    stats = simulated_returns.percentile_bands((lower_pct, 50, upper_pct))
+    if max_points is not None and len(days) > max_points:
+        # keeps the dips of the lower band and the peaks of the upper one
+        positions = np.union1d(_extreme_positions(stats[0], max_points), _extreme_positions(stats[2], max_points))
+        days, stats = days[positions], stats[:, positions]
 
     axes.axhline(cvar, color="red", linestyle="--", linewidth=1, label=f"CVaR ({cvar:.2%})")
     axes.fill_between(days, stats[0], stats[2], color="blue", alpha=0.4,
@@ -225,3 +311,96 @@ def plot_simulations_cumulative(simulated_returns: np.ndarray, cvar: float, lowe
                     "Days in the future",
                     "Cumulative Returns", axes)
     return axes
+
+
+DRAWDOWN_LABELS = { # column of `drawdown_statistics` -> (x label, format of the values)
+    "max_drawdown": ("Maximum drawdown", "{:.2%}"),
+    "max_duration": ("Longest drawdown (days)", "{:.0f} days"),
+    "time_under_water": ("Share of days under water", "{:.1%}"),
+}
+
+
+def plot_drawdown_distribution(statistics: Union[pd.DataFrame, np.ndarray, fs.SimulationResult],
+                               column: str = "max_drawdown", percentile: float = 5,
+                               axes: Axes = None) -> Axes:
+    """Plot the distribution of a drawdown figure across simulated paths, with a tail percentile.
+
+    Args:
+        statistics (pd.DataFrame, np.ndarray or SimulationResult): Output of
+            `future_simulation.drawdown_statistics`, or the simulated daily returns to compute it.
+        column (str): 'max_drawdown', 'max_duration' or 'time_under_water'.
+        percentile (float): Share of the worst paths to mark, in %; e.g. 5 marks the maximum
+            drawdown that only 5% of the paths exceed (default is 5).
+        axes (Axes, optional): Axis to plot on. If None, creates a new figure and axis.
+
+    Returns:
+        Axes: The matplotlib Axes object with the plot.
+    """
+    if axes is None:
+        axes = ax_setup()
+    if not isinstance(statistics, pd.DataFrame):
+        statistics = fs.drawdown_statistics(statistics)
+
+    values = statistics[column]
+    label, value_format = DRAWDOWN_LABELS[column]
+    # drawdowns are worse when lower, durations when higher
+    limit = np.percentile(values, percentile if column == "max_drawdown" else 100 - percentile)
+    axes.hist(values, bins=50, color="blue", alpha=0.8, edgecolor="k", label="Simulated paths")
+    axes.axvline(limit, color="red", linestyle="--", linewidth=1,
+                 label=f"Worst {percentile:g}% ({value_format.format(limit)})")
+    set_plot_labels(f"{label} across {len(values):,} simulated paths", label, "Frequency", axes)
+    return axes
+
+
+def render_panel(panel: tuple, size: tuple = (10, 6), dpi: int = 100) -> np.ndarray:
+    """Draws one plot on its own off-screen (Agg) figure and returns the pixels.
+
+    Args:
+        panel (tuple): (function, args, kwargs) or (function, args, kwargs, title); the function
+            is called as function(*args, axes=axes, **kwargs), like the plot functions above.
+        size (tuple): Width and height of the panel in inches.
+        dpi (int): Pixels per inch.
+
+    Returns:
+        np.ndarray: RGBA pixels (shape: height x width x 4).
+    """
+    function, args, kwargs, *title = panel
+    fig = Figure(figsize=size, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    axes = fig.add_subplot()
+    function(*args, axes=axes, **kwargs)
+    if title:
+        axes.set_title(title[0])
+    fig.tight_layout()
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba()).copy()
+
+
+def save_panels(panels: list, output: str, ncols: int = 2, size: tuple = (10, 6), dpi: int = 100,
+                workers: int = None):
+    """Renders plots in parallel processes and writes them as one grid image to a file.
+
+    Every panel is an independent figure, so they render on separate cores; the pixels are then
+    stacked into a grid and written in one go. Vector formats like PDF get the stitched raster.
+
+    Args:
+        panels (list): Panels as for `render_panel`, in row-major order.
+        output (str): File to write, e.g. 'dashboard.png' or 'dashboard.pdf'.
+        ncols (int): Panels per row.
+        size (tuple): Width and height of each panel in inches.
+        dpi (int): Pixels per inch.
+        workers (int, optional): Number of processes; None uses one per panel up to the number
+            of cores, 1 renders in this process.
+    """
+    workers = workers or min(len(panels), os.cpu_count() or 1)
+    if workers == 1:
+        images = [render_panel(panel, size, dpi) for panel in panels]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            images = list(pool.map(render_panel, panels, [size] * len(panels), [dpi] * len(panels)))
+
+    # white panels fill up the last row
+    blank = np.full_like(images[0], 255)
+    images += [blank] * (-len(images) % ncols)
+    rows = [np.concatenate(images[i:i + ncols], axis=1) for i in range(0, len(images), ncols)]
+    mpimg.imsave(output, np.concatenate(rows, axis=0), dpi=dpi)